@@ -0,0 +1,15 @@
+"""
+Conway's Conundrum: a twist on Conway's Game of Life.
+
+Submodules are imported on demand so headless tools never load pygame or matplotlib:
+
+    python main.py                                 (the window, conways_conundrum.gui)
+    python -m conways_conundrum.headless           (runs without a window)
+    python -m conways_conundrum.ensemble           (many boards stepped as one array)
+    python -m conways_conundrum.cache              (stored headless/ensemble results)
+    python -m conways_conundrum.server             (watch and steer a board from a browser)
+    python -m conways_conundrum.analytics          (query a saved statistics history)
+    python -m conways_conundrum.benchmark
+    python -m conways_conundrum.oracle
+
+"""
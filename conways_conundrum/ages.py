@@ -0,0 +1,117 @@
+import numpy as np
+from . import engine
+from . import memory
+
+"""
+Age distribution tracking for Conway's Conundrum.
+
+Each generation the age plane is reduced to one histogram (bin 0 is dead cells),
+and the live cell count and clamped average age are read off it, so the board is
+only scanned once. Ages are kept unclamped up to what the board type can hold.
+Histograms are stored as rows of a uint32 array with a bin per age up to MAX_AGE
+and one last bin for every older cell, so a row stays MAX_AGE + 2 wide however
+long cells live.
+
+Lifetimes at death are counted by step_board itself (see its deaths argument)
+into a single array per run.
+
+"""
+
+def new_tracker(max_age, spill=None):
+    return {
+        "count": 0,
+        # Directory of the memory-mapped files histograms grow into, None keeps them in memory
+        "spill": spill,
+        "generations": np.zeros(64, np.int64),
+        # Ages 0..MAX_AGE, then one bin for anything older
+        "histograms": np.zeros((64, max_age + 2), np.uint32),
+        # deaths[age] is how many cells died at that age, the last bin also holds saturated ages
+        "deaths": np.zeros(np.iinfo(engine.age_dtype(max_age)).max + 1, np.int64)
+    }
+
+def resize(tracker, max_age):
+    # A larger MAX_AGE needs more histogram bins and can widen the board's age type.
+    # Earlier rows keep their older cells in what becomes the MAX_AGE + 1 bin
+    size = np.iinfo(engine.age_dtype(max_age)).max + 1
+    if size > tracker["deaths"].size:
+        tracker["deaths"] = np.concatenate([tracker["deaths"], np.zeros(size - tracker["deaths"].size, np.int64)])
+
+    stored = tracker["histograms"]
+    if max_age + 2 > stored.shape[1]:
+        grown = memory.allocate((stored.shape[0], max_age + 2), np.uint32, tracker["spill"])
+        grown[:, :stored.shape[1]] = stored
+        tracker["histograms"] = grown
+
+def age_histogram(board):
+    # Count of every age on the board, index 0 is dead cells
+    flat = board.ravel()
+    if flat.dtype != np.uint8 or flat.size < 2:
+        return np.bincount(flat)
+
+    # Two uint8 cells read as one uint16 halve the elements bincount has to walk,
+    # the 256 x 256 table of pairs then folds back into per-cell counts
+    even = flat.size - flat.size % 2
+    pairs = np.bincount(flat[:even].view(np.uint16), minlength=65536).reshape(256, 256)
+    counts = pairs.sum(axis=0) + pairs.sum(axis=1)
+    if even < flat.size:
+        counts[flat[-1]] += 1
+    return counts[:np.flatnonzero(counts)[-1] + 1]
+
+def position_histogram(positions, max_age):
+    # Same as age_histogram for a {(col, row): age} dict, without the dead cells. Dict ages
+    # have no limit, so they saturate like the board's age type would
+    if not positions:
+        return np.zeros(1, np.int64)
+    limit = np.iinfo(engine.age_dtype(max_age)).max
+    return np.bincount(np.minimum(np.fromiter(positions.values(), np.int64, len(positions)), limit))
+
+def summarize(histogram, max_age):
+    # (live cells, clamped total age) from a histogram
+    live = int(histogram[1:].sum())
+    ages = np.minimum(np.arange(histogram.size), max_age)
+    return live, int(histogram[1:] @ ages[1:])
+
+def record(tracker, histogram, generation):
+    index = tracker["count"]
+    stored = tracker["histograms"]
+
+    # Grow by doubling like a list
+    if index == stored.shape[0]:
+        tracker["histograms"] = stored = memory.grow(stored, 2 * index, tracker["spill"])
+        tracker["generations"] = memory.grow(tracker["generations"], 2 * index, tracker["spill"])
+
+    # Everything past the last bin is added into it
+    last = stored.shape[1] - 1
+    tracker["generations"][index] = generation
+    stored[index, :min(histogram.size, last)] = histogram[:last]
+    stored[index, histogram.size:last] = 0
+    stored[index, last] = histogram[last:].sum()
+    tracker["count"] = index + 1
+
+def clear(tracker):
+    # Drops every histogram and lifetime, keeping the stores for the next run
+    tracker["count"] = 0
+    tracker["deaths"][:] = 0
+
+def spill(tracker, directory=None):
+    tracker["spill"] = memory.spill(tracker, ("generations", "histograms"), directory)
+
+def add_deaths(tracker, lifetimes):
+    # For engines that don't count deaths themselves: ages of the cells that died
+    counts = np.bincount(np.asarray(lifetimes, np.int64), minlength=1)
+    deaths = tracker["deaths"]
+    deaths[-1] += counts[deaths.size:].sum()
+    deaths[:min(counts.size, deaths.size)] += counts[:deaths.size]
+
+def series(tracker):
+    # Trimmed copies: generations, (generations, ages) histograms and the lifetime distribution
+    count = tracker["count"]
+    histograms = tracker["histograms"][:count]
+    used = np.flatnonzero(histograms.any(axis=0))
+    deaths = tracker["deaths"]
+    died = np.flatnonzero(deaths)
+    return {
+        "generations": tracker["generations"][:count].copy(),
+        "histograms": histograms[:, :used[-1] + 1 if used.size else 1].copy(),
+        "deaths": deaths[:died[-1] + 1 if died.size else 1].copy()
+    }
@@ -0,0 +1,235 @@
+import argparse
+import json
+import operator
+import numpy as np
+
+"""
+Queries over a run's statistics history.
+
+A history is a dict of equally long columns with a sorted "Generation" column:
+headless/ensemble results["History"], history.columns() from the window (which
+starts over on every new soup or cleared board), or the "History" of a saved
+--output file (load()). Generation ranges are found by
+binary search on the generation column, and every query is a handful of numpy
+passes, so they stay in the milliseconds on million-generation histories.
+Ensemble columns are (generations, boards) and give one answer per board.
+Columns that only some generations have (census counts) are NaN elsewhere and
+those rows are skipped.
+
+    analytics.extreme(columns, "Live Cells", "max", 5000, 20000)
+    analytics.first(columns, "Population Density", "<", 0.05)
+    analytics.rolling(columns, "Average Age", 1000)
+
+From the command line, on a headless run or a saved --output file:
+
+    python -m conways_conundrum.headless --generations 20000 --query "max live-cells 5000:20000"
+    python -m conways_conundrum.analytics run.json "first population-density < 0.05" "rolling mean average-age 1000"
+
+"""
+
+COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq}
+
+AGGREGATES = ("min", "max", "mean", "sum", "std")
+
+def load(path):
+    # Columns of a json file written by headless/ensemble --output
+    with open(path, "r") as results_file:
+        results = json.load(results_file)
+    return {name: np.asarray(values, float) for name, values in results["History"].items()}
+
+def with_rows(columns, rows):
+    # Adds per-generation dicts that only cover some generations (like the headless census) as
+    # extra columns, NaN on the other rows
+    merged = dict(columns)
+    if not rows:
+        return merged
+    indexes = np.searchsorted(columns["Generation"], [row["Generation"] for row in rows])
+    for name in dict.fromkeys(name for row in rows for name in row if name != "Generation"):
+        merged[name] = np.full(len(columns["Generation"]), np.nan)
+        merged[name][indexes] = [row.get(name, np.nan) for row in rows]
+    return merged
+
+def resolve(columns, name):
+    # Accepts "Live Cells", "live cells", "live-cells" or "live_cells"
+    if name in columns:
+        return name
+    wanted = name.lower().replace("-", " ").replace("_", " ")
+    for column in columns:
+        if column.lower() == wanted:
+            return column
+    raise KeyError(f"No column {name!r}, have {', '.join(columns)}")
+
+def window(columns, start=None, stop=None):
+    # Row slice of generations start <= generation <= stop, found by binary search. That needs
+    # the generations in order, which every history above has; anything else is refused
+    generations = columns["Generation"]
+    if (start is not None or stop is not None) and np.any(generations[1:] < generations[:-1]):
+        raise ValueError("Generation column is out of order, ranges need one run's history")
+    low = 0 if start is None else int(np.searchsorted(generations, start, "left"))
+    high = len(generations) if stop is None else int(np.searchsorted(generations, stop, "right"))
+    return slice(low, high)
+
+def series(columns, name, start=None, stop=None):
+    # (generations, values) in the range, rows where the column is NaN dropped for 1-d columns
+    rows = window(columns, start, stop)
+    generations = columns["Generation"][rows]
+    values = columns[resolve(columns, name)][rows]
+    if values.ndim == 1 and values.dtype.kind == "f":
+        present = ~np.isnan(values)
+        if not present.all():
+            return generations[present], values[present]
+    return generations, values
+
+def extreme(columns, name, how="max", start=None, stop=None):
+    # (generation, value) of the min or max in the range, per board for ensembles; None when the range is empty
+    generations, values = series(columns, name, start, stop)
+    if not len(values):
+        return None
+    index = np.nanargmax(values, axis=0) if how == "max" else np.nanargmin(values, axis=0)
+    if values.ndim > 1:
+        return generations[index], values[index, np.arange(values.shape[1])]
+    return generations[index], values[index]
+
+def aggregate(columns, name, how="mean", start=None, stop=None):
+    # min, max, mean, sum or std of a column over the range
+    if how not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate {how!r}, use one of {', '.join(AGGREGATES)}")
+    _, values = series(columns, name, start, stop)
+    if not len(values):
+        return None
+    return getattr(np, "nan" + how)(values, axis=0)
+
+def matches(columns, name, comparison, threshold, start=None, stop=None):
+    # (generations, mask) of rows where the column compares true against the threshold
+    generations, values = series(columns, name, start, stop)
+    return generations, COMPARISONS[comparison](values, threshold)
+
+def first(columns, name, comparison, threshold, start=None, stop=None):
+    # First generation where e.g. ("Population Density", "<", 0.05) holds, None if it never does
+    generations, mask = matches(columns, name, comparison, threshold, start, stop)
+    if not len(mask):
+        return None
+    index = mask.argmax(axis=0)
+    found = generations[index]
+    if mask.ndim > 1:
+        return np.where(mask.any(axis=0), found, -1)
+    return int(found) if mask[index] else None
+
+def last(columns, name, comparison, threshold, start=None, stop=None):
+    generations, mask = matches(columns, name, comparison, threshold, start, stop)
+    if not len(mask):
+        return None
+    index = len(mask) - 1 - mask[::-1].argmax(axis=0)
+    found = generations[index]
+    if mask.ndim > 1:
+        return np.where(mask.any(axis=0), found, -1)
+    return int(found) if mask[index] else None
+
+def count(columns, name, comparison, threshold, start=None, stop=None):
+    # Generations in the range where the comparison holds
+    _, mask = matches(columns, name, comparison, threshold, start, stop)
+    return mask.sum(axis=0)
+
+def spans(columns, name, comparison, threshold, start=None, stop=None):
+    # (first, last) generation of every unbroken stretch where the comparison holds, 1-d columns only
+    generations, mask = matches(columns, name, comparison, threshold, start, stop)
+    edges = np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8))
+    begins = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return list(zip(generations[begins].tolist(), generations[ends].tolist()))
+
+def rolling(columns, name, size, how="mean", start=None, stop=None):
+    # (generations, values): the aggregate over each run of `size` rows, labelled by its last generation
+    generations, values = series(columns, name, start, stop)
+    if size < 1 or size > len(values):
+        return generations[:0], values[:0]
+
+    if how in ("mean", "sum"):
+        # Running sums, one subtraction per window
+        totals = np.cumsum(values, axis=0, dtype=float)
+        sums = totals[size - 1:].copy()
+        sums[1:] -= totals[:-size]
+        return generations[size - 1:], sums / size if how == "mean" else sums
+    if how in ("min", "max"):
+        return generations[size - 1:], sliding_extreme(values, size, np.maximum if how == "max" else np.minimum)
+    raise ValueError(f"Unknown rolling aggregate {how!r}, use mean, sum, min or max")
+
+def sliding_extreme(values, size, combine):
+    # Max/min over every window in a fixed number of passes whatever the size: within blocks of
+    # `size` rows, a running extreme from the block start and one from the block end cover any window
+    rows = len(values)
+    blocks = -(-rows // size)
+    fill = -np.inf if combine is np.maximum else np.inf
+    padded = np.full((blocks * size, *values.shape[1:]), fill)
+    padded[:rows] = values
+    shaped = padded.reshape(blocks, size, *values.shape[1:])
+    forward = combine.accumulate(shaped, axis=1).reshape(padded.shape)
+    backward = combine.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    return combine(backward[:rows - size + 1], forward[size - 1:rows])
+
+def parse_range(text):
+    # "5000:20000", "5000:" or ":20000"
+    start, _, stop = text.partition(":")
+    return (int(start) if start else None), (int(stop) if stop else None)
+
+def run_query(columns, query):
+    # One line of text answer for a query string:
+    #   max|min|mean|sum|std COLUMN [START:STOP]
+    #   first|last|count|spans COLUMN OP VALUE [START:STOP]
+    #   rolling mean|sum|min|max COLUMN SIZE [START:STOP]
+    words = query.split()
+    if not words:
+        raise ValueError("Empty query")
+    kind, arguments = words[0].lower(), words[1:]
+    start = stop = None
+    if arguments and ":" in arguments[-1]:
+        start, stop = parse_range(arguments.pop())
+
+    if kind in AGGREGATES and len(arguments) == 1:
+        name = resolve(columns, arguments[0])
+        if kind in ("min", "max"):
+            found = extreme(columns, name, kind, start, stop)
+            return f"{query}: " + ("no rows" if found is None else f"{format_value(found[1])} at generation {format_value(found[0])}")
+        found = aggregate(columns, name, kind, start, stop)
+        return f"{query}: " + ("no rows" if found is None else format_value(found))
+
+    if kind in ("first", "last", "count", "spans") and len(arguments) == 3 and arguments[1] in COMPARISONS:
+        name = resolve(columns, arguments[0])
+        comparison, threshold = arguments[1], float(arguments[2])
+        if kind == "spans":
+            found = spans(columns, name, comparison, threshold, start, stop)
+            longest = max(found, key=lambda span: span[1] - span[0], default=None)
+            return f"{query}: {len(found)} spans" + (f", longest {format_value(longest[0])}-{format_value(longest[1])}" if longest else "")
+        found = {"first": first, "last": last, "count": count}[kind](columns, name, comparison, threshold, start, stop)
+        return f"{query}: {'never' if found is None else format_value(found)}"
+
+    if kind == "rolling" and len(arguments) == 3:
+        how, name, size = arguments[0].lower(), resolve(columns, arguments[1]), int(arguments[2])
+        generations, values = rolling(columns, name, size, how, start, stop)
+        if not len(values) or values.ndim > 1:
+            return f"{query}: " + ("no rows" if not len(values) else f"{len(values)} windows")
+        high, low = int(np.nanargmax(values)), int(np.nanargmin(values))
+        return f"{query}: highest {format_value(values[high])} ending at {generations[high]:.0f}, lowest {format_value(values[low])} ending at {generations[low]:.0f}"
+
+    raise ValueError(f"Can't read query {query!r}")
+
+def format_value(value):
+    values = np.atleast_1d(np.asarray(value, float))
+    text = ", ".join(f"{number:.0f}" if np.isfinite(number) and number == int(number) else f"{number:.4g}" for number in values)
+    return text if np.ndim(value) == 0 else f"[{text}]"
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the statistics history of a saved run (headless/ensemble --output)")
+    parser.add_argument("results", help="json file written with --output")
+    parser.add_argument("queries", nargs="+", help='e.g. "max live-cells 5000:20000" or "first population-density < 0.05"')
+    args = parser.parse_args()
+
+    columns = load(args.results)
+    for query in args.queries:
+        try:
+            print(run_query(columns, query))
+        except (KeyError, ValueError) as error:
+            raise SystemExit(f"error: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from . import config
+from . import engine
+from . import headless
+from . import ages
+from . import history
+
+"""
+Benchmarks for Conway's Conundrum.
+
+Every workload is a seeded soup, so two runs on different commits step exactly
+the same boards. Results are written as json and can be compared against an
+earlier run:
+
+    python -m conways_conundrum.benchmark --output before.json
+    python -m conways_conundrum.benchmark --output after.json --compare before.json
+
+"""
+
+CLASSIC = {"SURVIVAL_CELL_AMOUNT": [2, 3], "REPRODUCTION_CELL_AMOUNT": [3], "MAX_AGE": 10, "AGE_DEATH": False}
+
+WORKLOADS = {
+    "soup-100": {"GRID": 100, "DENSITY": 0.25, **CLASSIC},
+    "soup-250": {"GRID": 250, "DENSITY": 0.25, **CLASSIC},
+    "soup-1000": {"GRID": 1000, "DENSITY": 0.25, **CLASSIC},
+    "sparse-1000": {"GRID": 1000, "DENSITY": 0.02, **CLASSIC},
+    "age-death-250": {"GRID": 250, "DENSITY": 0.25, **CLASSIC, "AGE_DEATH": True},
+    "highlife-250": {"GRID": 250, "DENSITY": 0.25, **CLASSIC, "REPRODUCTION_CELL_AMOUNT": [3, 6]},
+    "age-variants-250": {
+        "GRID": 250, "DENSITY": 0.25, **CLASSIC, "AGE_DEATH": True,
+        "AGE_SURVIVAL_CELL_AMOUNT": {"5": [3]}, "AGE_DEATH_CHANCE": 0.2, "OLD_NEIGHBOR_WEIGHT": 2
+    },
+}
+
+gui_module = None
+
+def load_gui(workload):
+    # The window modules need a display, a dummy one is enough to render into
+    global gui_module
+    if gui_module is None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from . import gui
+        gui_module = gui
+
+    params = config.window_parameters()
+    params.update({name: value for name, value in workload.items() if name in params})
+    params["TILE_SIZE"] = max(1, params["WIDTH"] // workload["GRID"])
+    params["WIDTH"] = params["HEIGHT"] = params["TILE_SIZE"] * workload["GRID"]
+    gui_module.setup(params)
+    return gui_module
+
+def seeded_board(workload, seed):
+    rng = np.random.default_rng(seed)
+    board = engine.empty_board(workload["GRID"], workload["GRID"], workload["MAX_AGE"])
+    board[:-1, :-1] = rng.random((workload["GRID"], workload["GRID"])) < workload["DENSITY"]
+    return board
+
+def dict_step(workload):
+    rules = engine.make_rules(workload)
+    return lambda positions: engine.step_positions(positions, rules, workload["GRID"], workload["GRID"])
+
+def array_step(workload):
+    rules = engine.make_rules(workload)
+    rng = np.random.default_rng(0)
+    return lambda board: engine.step_board(board, rules, rng)
+
+def jit_step(workload):
+    # Double buffered like a real run, so the memory profile shows what a generation allocates
+    step = engine.stepper("jit", engine.make_rules(workload))
+    rng = np.random.default_rng(0)
+    return lambda board: step(board, rng)
+
+# name -> (setup returning a step function, whether it steps a positions dict)
+ENGINES = {
+    "dict": (dict_step, True),
+    "array": (array_step, False),
+    "jit": (jit_step, False),
+}
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99))
+    }
+
+def timed(function, state, generations, budget):
+    # Steps until `generations` or `budget` seconds, whichever comes first
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < generations and time.perf_counter() - start < budget:
+        tick = time.perf_counter()
+        state = function(state)
+        samples.append(time.perf_counter() - tick)
+    return state, samples
+
+def memory_profile(function, state, generations, budget):
+    # Peak traced memory over the run, and the transient peak inside a single generation
+    tracemalloc.start()
+    per_generation = []
+    start = time.perf_counter()
+    while len(per_generation) < generations and (not per_generation or time.perf_counter() - start < budget):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        state = function(state)
+        per_generation.append(tracemalloc.get_traced_memory()[1] - before)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"peak_kib": peak / 1024, "alloc_kib_per_gen": float(np.mean(per_generation)) / 1024}
+
+def bench_engine(name, workload_name, workload, seed, generations, budget):
+    setup, uses_positions = ENGINES[name]
+    if uses_positions and not engine.make_rules(workload)["classic"]:
+        return None
+
+    step = setup(workload)
+    state = seeded_board(workload, seed)
+    if uses_positions:
+        state = engine.board_to_positions(state)
+
+    # One untimed generation first, so import and cache warm-up don't land in the samples
+    state = step(state)
+    state, samples = timed(step, state, generations, budget)
+    memory = memory_profile(step, state, min(5, generations), budget)
+
+    return {
+        "benchmark": "step",
+        "engine": name,
+        "workload": workload_name,
+        "generations": len(samples),
+        "gens_per_sec": len(samples) / sum(samples),
+        **percentiles(samples),
+        **memory
+    }
+
+def bench_render(workload_name, workload, seed, frames, budget):
+    gui = load_gui(workload)
+    positions = engine.board_to_positions(seeded_board(workload, seed))
+    results = []
+
+    for show_grid in (False, True):
+        def frame(_):
+            gui.screen.fill(gui.BG_COLOR)
+            gui.draw_grid(positions, show_grid)
+
+        frame(None)
+        _, samples = timed(frame, None, frames, budget)
+        results.append({
+            "benchmark": "render",
+            "renderer": "draw_grid" + ("+lines" if show_grid else ""),
+            "workload": workload_name,
+            "frames": len(samples),
+            "fps": len(samples) / sum(samples),
+            **percentiles(samples)
+        })
+
+    ages = list(positions.values())
+    start = time.perf_counter()
+    for age in ages:
+        gui.get_color(age)
+    results.append({
+        "benchmark": "render",
+        "renderer": "get_color",
+        "workload": workload_name,
+        "calls_per_sec": len(ages) / (time.perf_counter() - start)
+    })
+    return results
+
+def bench_statistics(workload_name, workload, seed, calls, budget):
+    gui = load_gui(workload)
+    board = seeded_board(workload, seed)
+    positions = engine.board_to_positions(board)
+    total_cells = workload["GRID"] ** 2
+
+    def dict_statistics(_):
+        gui.calculate_statistics(positions, 1, len(positions))
+
+    def array_statistics(_):
+        headless.board_statistics(ages.age_histogram(board), workload["MAX_AGE"], total_cells, len(positions))
+
+    results = []
+    for name, function in (("calculate_statistics", dict_statistics), ("board_statistics", array_statistics)):
+        _, samples = timed(function, None, calls, budget)
+        results.append({
+            "benchmark": "statistics",
+            "function": name,
+            "workload": workload_name,
+            "calls": len(samples),
+            **percentiles(samples)
+        })
+    history.clear(gui.statistics_history)
+    return results
+
+# Our own import cost on top of numpy; headless runs must not pull in the window or plotting stacks
+IMPORT_BUDGET_MS = 50
+HEADLESS_FORBIDDEN = ("pygame", "matplotlib")
+
+STARTUP_SCRIPT = """
+import sys, time
+import numpy
+start = time.perf_counter()
+import conways_conundrum.headless
+print((time.perf_counter() - start) * 1000)
+print(",".join(name for name in %r if name in sys.modules))
+""" % (HEADLESS_FORBIDDEN,)
+
+def bench_startup(runs=5):
+    # Fresh interpreters, best of `runs` so disk cache noise doesn't count against the budget
+    import_times = []
+    process_times = []
+    loaded = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=config.ROOT_DIR, capture_output=True, text=True, check=True).stdout
+        process_times.append((time.perf_counter() - start) * 1000)
+        import_ms, forbidden = output.splitlines()
+        import_times.append(float(import_ms))
+        loaded.update(name for name in forbidden.split(",") if name)
+
+    return {
+        "benchmark": "startup",
+        "import_ms": min(import_times),
+        "process_ms": min(process_times),
+        "budget_ms": IMPORT_BUDGET_MS,
+        "forbidden_loaded": sorted(loaded),
+        "within_budget": min(import_times) <= IMPORT_BUDGET_MS and not loaded
+    }
+
+def metadata(seed):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=config.ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "commit": commit,
+        "seed": seed,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+def result_key(result):
+    return tuple(str(result.get(field)) for field in ("benchmark", "engine", "renderer", "function", "workload"))
+
+# Higher is better for rates, lower is better for times and memory
+COMPARED = {"gens_per_sec": 1, "fps": 1, "calls_per_sec": 1, "p50_ms": -1, "peak_kib": -1, "import_ms": -1}
+
+def compare(results, baseline):
+    previous = {result_key(result): result for result in baseline["results"]}
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        changes = []
+        for metric, direction in COMPARED.items():
+            if metric in result and metric in old and old[metric]:
+                ratio = result[metric] / old[metric]
+                speedup = ratio if direction > 0 else 1 / ratio if ratio else float("inf")
+                changes.append(f"{metric} {speedup:.2f}x")
+        label = " ".join(part for part in result_key(result) if part != "None")
+        print(f"{label}: {', '.join(changes)}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Conway's Conundrum engines, rendering and statistics")
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=list(WORKLOADS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--generations", type=int, default=200, help="generations (or frames/calls) per measurement")
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds per measurement before stopping early")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-render", action="store_true")
+    parser.add_argument("--check-startup", action="store_true", help="only check headless import time and exit non-zero over budget")
+    parser.add_argument("--output", help="write results to this json file")
+    parser.add_argument("--compare", help="json results of an earlier run to compare against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    startup = bench_startup()
+    print(f"startup: import {startup['import_ms']:.1f} ms (budget {IMPORT_BUDGET_MS} ms), process {startup['process_ms']:.0f} ms")
+    if startup["forbidden_loaded"]:
+        print(f"startup: headless import loaded {', '.join(startup['forbidden_loaded'])}")
+    if args.check_startup:
+        return 0 if startup["within_budget"] else 1
+
+    results = [startup]
+
+    for workload_name in args.workloads:
+        workload = WORKLOADS[workload_name]
+        for name in args.engines:
+            result = bench_engine(name, workload_name, workload, args.seed, args.generations, args.budget)
+            if result is not None:
+                print(f"{workload_name} {name}: {result['gens_per_sec']:.1f} gens/sec, p95 {result['p95_ms']:.2f} ms, peak {result['peak_kib']:.0f} KiB")
+                results.append(result)
+
+        if not args.skip_render:
+            for result in bench_render(workload_name, workload, args.seed, args.generations, args.budget):
+                results.append(result)
+            for result in bench_statistics(workload_name, workload, args.seed, args.generations, args.budget):
+                results.append(result)
+
+    report = {"meta": metadata(args.seed), "results": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            compare(results, json.load(baseline_file))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
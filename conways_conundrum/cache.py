@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+from . import config
+
+"""
+Persistent result cache for headless and ensemble runs.
+
+A run is fully decided by its parameter fingerprint, seed, soup, generation count
+and a few run options, so its summary (statistics history, cycle event, census,
+lifetimes and optionally the final board) is stored in one SQLite file under that
+key. Repeat studies read the summary back instead of stepping. Entries are packed
+into a single compressed .npz blob, and the least recently used ones are evicted
+once the file holds more than CACHE_SIZE bytes of results.
+
+    python -m conways_conundrum.cache            (entries and size)
+    python -m conways_conundrum.cache --clear
+
+"""
+
+# Total size of stored results before least recently used entries are dropped
+CACHE_SIZE = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT,
+    fingerprint TEXT,
+    seed INTEGER,
+    soup INTEGER,
+    generations INTEGER,
+    used REAL,
+    size INTEGER,
+    data BLOB
+)
+"""
+
+def connect(path=None):
+    path = path or config.CACHE_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    return connection
+
+def cache_key(kind, params, seed, soup, generations, options=None):
+    # options holds anything besides the fingerprinted parameters that changes the result
+    text = json.dumps({
+        "Kind": kind,
+        "Fingerprint": config.fingerprint(params),
+        "Seed": seed,
+        "Soup": soup,
+        "Generations": generations,
+        "Options": options or {}
+    }, sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def pack(summary):
+    # Arrays go into the npz as they are, everything else into one json string
+    arrays = {f"History/{name}": np.asarray(column) for name, column in summary["History"].items()}
+    values = {}
+    for name, value in summary.items():
+        if name == "History":
+            continue
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        else:
+            values[name] = value
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, values=json.dumps(values), **arrays)
+    return buffer.getvalue()
+
+def unpack(data):
+    with np.load(io.BytesIO(data)) as stored:
+        summary = json.loads(str(stored["values"]))
+        summary["History"] = {}
+        for name in stored.files:
+            if name.startswith("History/"):
+                summary["History"][name[len("History/"):]] = stored[name]
+            elif name != "values":
+                summary[name] = stored[name]
+    return summary
+
+def lookup(key, path=None):
+    # The stored summary, or None. A hit counts as a use for eviction
+    connection = connect(path)
+    try:
+        row = connection.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+        return unpack(row[0])
+    finally:
+        connection.close()
+
+def store(key, summary, metadata, kind="headless", generations=0, path=None, limit=CACHE_SIZE):
+    # metadata is config.run_metadata for the run, kept in columns for browsing the file
+    data = pack(summary)
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, metadata["Fingerprint"], metadata["Seed"], metadata["Soup"], generations, time.time(), len(data), data)
+            )
+            evict(connection, limit)
+    finally:
+        connection.close()
+
+def evict(connection, limit):
+    # Drops the least recently used entries until the rest fits in limit bytes
+    total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= limit:
+        return 0
+
+    removed = []
+    for key, size in connection.execute("SELECT key, size FROM results ORDER BY used"):
+        if total <= limit:
+            break
+        removed.append((key,))
+        total -= size
+    connection.executemany("DELETE FROM results WHERE key = ?", removed)
+    return len(removed)
+
+def stats(path=None):
+    connection = connect(path)
+    try:
+        count, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"Entries": count, "Bytes": size}
+    finally:
+        connection.close()
+
+def clear(path=None):
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM results")
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the result cache")
+    parser.add_argument("--clear", action="store_true", help="remove every cached result")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+    summary = stats()
+    print(f"{config.CACHE_FILE}: {summary['Entries']} results, {summary['Bytes'] / 1024 / 1024:.1f} MB of {CACHE_SIZE / 1024 / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import numpy as np
+from . import engine
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+"""
+Object census for Conway's Conundrum.
+
+Live cells are split into 8-connected objects. Each object is cropped to its
+bounding box and reduced to a canonical form under rotation/reflection, then
+looked up in a library of known objects. Objects are processed in batches of
+equal bounding box size, so the per-object work is all array operations.
+Unknown pieces are looked at again with cells up to two apart joined, since
+some phases (the LWSS, toad and beacon each have one) fall apart into pieces.
+
+Names follow the standard B3/S23 rules; under other rules they just name the shape.
+
+"""
+
+# Seed pattern and period of each known object, every phase is added to the library
+KNOWN_OBJECTS = {
+    "Block": (["OO", "OO"], 1),
+    "Beehive": ([".OO.", "O..O", ".OO."], 1),
+    "Loaf": ([".OO.", "O..O", ".O.O", "..O."], 1),
+    "Boat": (["OO.", "O.O", ".O."], 1),
+    "Ship": (["OO.", "O.O", ".OO"], 1),
+    "Tub": ([".O.", "O.O", ".O."], 1),
+    "Pond": ([".OO.", "O..O", "O..O", ".OO."], 1),
+    "Long Boat": (["OO..", "O.O.", ".O.O", "..O."], 1),
+    "Blinker": (["OOO"], 2),
+    "Toad": ([".OOO", "OOO."], 2),
+    "Beacon": (["OO..", "OO..", "..OO", "..OO"], 2),
+    "Glider": ([".O.", "..O", "OOO"], 4),
+    "LWSS": ([".O..O", "O....", "O...O", "OOOO."], 4),
+}
+
+CLASSIC_RULES = engine.make_rules({"MAX_AGE": 1, "SURVIVAL_CELL_AMOUNT": [2, 3], "REPRODUCTION_CELL_AMOUNT": [3], "AGE_DEATH": False})
+
+library = None
+
+def label_components(alive, reach=1):
+    # Returns rows, cols and an object id (0..k-1) for every live cell. Cells up to `reach`
+    # apart in both directions are one object, so reach 1 is 8-connected
+    if ndimage is not None:
+        labels, _ = ndimage.label(alive, structure=np.ones((2 * reach + 1, 2 * reach + 1)))
+        rows, cols = np.nonzero(labels)
+        return rows, cols, labels[rows, cols] - 1
+
+    # Without scipy: union-find over horizontal runs of live cells, which are several times
+    # fewer than the cells. Runs are found per row, in row-major order
+    width = alive.shape[1]
+    edges = np.diff(np.pad(alive.view(np.int8), ((0, 0), (1, 1))), axis=1)
+    run_rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1] - 1
+    count = starts.size
+
+    # Runs as positions in the flattened board (spare columns so rows never come within reach),
+    # which keeps them sorted by start and by end alike. The runs `distance` rows above that are
+    # within reach of a run are a contiguous stretch: from the first ending at or after
+    # start - reach to the last starting at or before end + reach
+    stride = width + 2 * reach
+    lower, upper = [], []
+    # Runs of the same row are only within reach of their neighbor
+    near = np.flatnonzero((run_rows[1:] == run_rows[:-1]) & (starts[1:] - ends[:-1] <= reach))
+    lower.append(near + 1)
+    upper.append(near)
+    for distance in range(1, reach + 1):
+        above = (run_rows - distance) * stride
+        first = np.searchsorted(run_rows * stride + ends, above + starts - reach, "left")
+        last = np.searchsorted(run_rows * stride + starts, above + ends + reach, "right")
+        touching = np.where(run_rows >= distance, np.maximum(last - first, 0), 0)
+        offsets = np.arange(touching.sum()) - np.repeat(np.cumsum(touching) - touching, touching)
+        lower.append(np.repeat(np.arange(count), touching))
+        upper.append(np.repeat(first, touching) + offsets)
+    lower, upper = np.concatenate(lower), np.concatenate(upper)
+
+    # Hook the root of both ends of every link onto the smaller label, then flatten every
+    # chain by pointer jumping, until a pass changes nothing. Each label ends up as the
+    # first run of its object
+    labels = np.arange(count)
+    while True:
+        previous = labels.copy()
+        smaller = np.minimum(labels[lower], labels[upper])
+        np.minimum.at(labels, labels[lower], smaller)
+        np.minimum.at(labels, labels[upper], smaller)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            break
+
+    roots = labels == np.arange(count)
+    component = (np.cumsum(roots) - 1)[labels]
+    rows, cols = np.nonzero(alive)
+    return rows, cols, np.repeat(component, ends - starts + 1)
+
+def canonical_keys(crops):
+    # crops is (k, h, w) with h <= w; returns one key per object, the same for every rotation/reflection
+    k, h, w = crops.shape
+    variants = [crops, crops[:, ::-1, :], crops[:, :, ::-1], crops[:, ::-1, ::-1]]
+    if h == w:
+        transposed = crops.transpose(0, 2, 1)
+        variants += [transposed, transposed[:, ::-1, :], transposed[:, :, ::-1], transposed[:, ::-1, ::-1]]
+
+    packed = [np.packbits(variant.reshape(k, -1), axis=1) for variant in variants]
+
+    if h * w <= 64:
+        # Small objects pack into one big-endian integer, so the minimum is a single reduction
+        padded = [np.pad(p, ((0, 0), (0, 8 - p.shape[1]))) for p in packed]
+        return np.stack([p.view(">u8")[:, 0] for p in padded]).min(axis=0)
+
+    return np.array([min(p[i].tobytes() for p in packed) for i in range(k)], object)
+
+def crop_groups(alive, reach=1):
+    # Yields (crops, tops, lefts, flipped) for every group of objects with the same bounding box,
+    # transposed so h <= w (flipped says which were)
+    rows, cols, component = label_components(alive, reach)
+    if rows.size == 0:
+        return
+
+    # Sort cells by object once, so bounding boxes are segment reductions
+    order = np.argsort(component, kind="stable")
+    rows, cols, component = rows[order], cols[order], component[order]
+    starts = np.flatnonzero(np.r_[True, component[1:] != component[:-1]])
+
+    top = np.minimum.reduceat(rows, starts)
+    left = np.minimum.reduceat(cols, starts)
+    heights = np.maximum.reduceat(rows, starts) - top + 1
+    widths = np.maximum.reduceat(cols, starts) - left + 1
+    flipped = heights > widths
+    short = np.where(flipped, widths, heights)
+    long = np.where(flipped, heights, widths)
+
+    # Cell offsets inside each object's box, swapped for the transposed objects
+    dy = rows - top[component]
+    dx = cols - left[component]
+    cell_flipped = flipped[component]
+    dy, dx = np.where(cell_flipped, dx, dy), np.where(cell_flipped, dy, dx)
+
+    # Then sort objects (and their cells) by box size, so each group is one contiguous slice
+    shapes = short * (long.max() + 1) + long
+    object_order = np.argsort(shapes, kind="stable")
+    rank = np.empty_like(object_order)
+    rank[object_order] = np.arange(object_order.size)
+    cell_rank = rank[component]
+    cell_order = np.argsort(cell_rank, kind="stable")
+    cell_rank, dy, dx = cell_rank[cell_order], dy[cell_order], dx[cell_order]
+
+    sorted_shapes = shapes[object_order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_shapes[1:] != sorted_shapes[:-1]])
+    group_ends = np.r_[group_starts[1:], object_order.size]
+    cell_bounds = np.searchsorted(cell_rank, np.r_[group_starts, object_order.size])
+
+    for i, (start, end) in enumerate(zip(group_starts, group_ends)):
+        members = object_order[start:end]
+        h, w = int(short[members[0]]), int(long[members[0]])
+        cells = slice(cell_bounds[i], cell_bounds[i + 1])
+
+        crops = np.zeros((end - start, h, w), bool)
+        crops[cell_rank[cells] - start, dy[cells], dx[cells]] = True
+        yield crops, top[members], left[members], flipped[members]
+
+def crop_cells(crops, tops, lefts, flipped):
+    # Which crop every live cell of crops belongs to, and its board row and col
+    member, dy, dx = np.nonzero(crops)
+    cell_flipped = flipped[member]
+    dy, dx = np.where(cell_flipped, dx, dy), np.where(cell_flipped, dy, dx)
+    return member, tops[member] + dy, lefts[member] + dx
+
+def pattern_board(pattern, margin):
+    height, width = len(pattern), len(pattern[0])
+    board = np.zeros((height + 2 * margin, width + 2 * margin), np.uint8)
+    for y, line in enumerate(pattern):
+        for x, char in enumerate(line):
+            if char == "O":
+                board[y + margin, x + margin] = 1
+    return board
+
+def build_library():
+    # {reach: {(h, w, key): name}}. Every phase is stored under the smallest reach that holds it
+    # together as one object: most are 8-connected, but some (two of the LWSS's) have a cell
+    # that is two cells away from the rest
+    lookup = {1: {}, 2: {}}
+    for name, (pattern, period) in KNOWN_OBJECTS.items():
+        board = pattern_board(pattern, period + 2)
+        for _ in range(period):
+            for reach in lookup:
+                groups = list(crop_groups(board > 0, reach))
+                if len(groups) == 1 and len(groups[0][0]) == 1:
+                    crops = groups[0][0]
+                    lookup[reach][(crops.shape[1], crops.shape[2], canonical_keys(crops)[0])] = name
+                    break
+            board = engine.step_board(board, CLASSIC_RULES)
+    return lookup
+
+def take_census(board):
+    # Returns {name: count} and {name: (rows, cols)} with the top-left corner of every object
+    global library
+    if library is None:
+        library = build_library()
+
+    counts = {name: 0 for name in KNOWN_OBJECTS}
+    corners = {name: [] for name in counts}
+    # Pieces that aren't a known object, numbered from 1 on the board for a second look if they
+    # are small enough to be part of a phase that falls apart
+    pieces = np.zeros(board.shape, np.int32)
+    other_tops, other_lefts = [], []
+    largest = max((w for _, w, _ in library[2]), default=0)
+
+    for crops, tops, lefts, flipped in crop_groups(board > 0):
+        h, w = crops.shape[1:]
+        keys, inverse, amounts = np.unique(canonical_keys(crops), return_inverse=True, return_counts=True)
+        for i, (key, amount) in enumerate(zip(keys.tolist(), amounts.tolist())):
+            name = library[1].get((h, w, key))
+            members = inverse == i
+            if name is not None:
+                counts[name] += amount
+                corners[name].append((tops[members], lefts[members]))
+                continue
+            if w <= largest:
+                member, rows, cols = crop_cells(crops[members], tops[members], lefts[members], flipped[members])
+                pieces[rows, cols] = len(other_tops) + 1 + member
+            other_tops.extend(tops[members].tolist())
+            other_lefts.extend(lefts[members].tolist())
+
+    # Unknown pieces close enough together can be one phase that falls apart into several
+    joined = np.zeros(len(other_tops) + 1, bool)
+    shapes = {(h, w) for h, w, _ in library[2]}
+    if pieces.any():
+        for crops, tops, lefts, flipped in crop_groups(pieces > 0, 2):
+            h, w = crops.shape[1:]
+            if (h, w) not in shapes:
+                continue
+            for j, key in enumerate(canonical_keys(crops).tolist()):
+                name = library[2].get((h, w, key))
+                if name is None:
+                    continue
+                counts[name] += 1
+                corners[name].append((tops[j:j + 1], lefts[j:j + 1]))
+                _, rows, cols = crop_cells(crops[j:j + 1], tops[j:j + 1], lefts[j:j + 1], flipped[j:j + 1])
+                joined[pieces[rows, cols]] = True
+
+    left_over = ~joined[1:]
+    counts["Other"] = int(left_over.sum())
+    if left_over.any():
+        corners["Other"] = [(np.array(other_tops)[left_over], np.array(other_lefts)[left_over])]
+    else:
+        corners["Other"] = []
+
+    objects = {
+        name: (np.concatenate([t for t, _ in found]), np.concatenate([l for _, l in found]))
+        for name, found in corners.items() if found
+    }
+    return counts, objects
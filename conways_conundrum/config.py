@@ -0,0 +1,308 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+
+"""
+Parameters and file locations for Conway's Conundrum.
+
+Nothing is read on import; call load_colors() / load_parameters() when a run starts.
+Every path is resolved from the repository root, not the current directory.
+
+"""
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLORS_FILE = os.path.join(ROOT_DIR, "data", "colors.json")
+PARAMETERS_FILE = os.path.join(ROOT_DIR, "data", "defaultparameters.json")
+FONT_FILE = os.path.join(ROOT_DIR, "fonts", "Minecraft.ttf")
+RULES_IMAGE_FILE = os.path.join(ROOT_DIR, "assets", "conways conundrum rules.png")
+STATISTICS_DIR = os.path.join(ROOT_DIR, "saved_statistics")
+SCREENSHOTS_DIR = os.path.join(ROOT_DIR, "images", "screenshots")
+RECORDINGS_DIR = os.path.join(ROOT_DIR, "images", "recordings")
+CACHE_FILE = os.path.join(ROOT_DIR, "result_cache", "results.sqlite3")
+SPILL_DIR = os.path.join(ROOT_DIR, "result_cache", "spill")
+
+use_default_parameters = False
+
+##### EXPERIMENTAL PARAMETERS #####
+EXPERIMENTAL_PARAMETERS = {
+    "WIDTH": 1000,
+    "HEIGHT": 1000,
+    "TILE_SIZE": 4,
+    "FPS": 60,
+    "UPDATE_FREQ": 1,
+    "MAX_AGE": 10,
+    "SURVIVAL_CELL_AMOUNT": [2, 3],
+    "REPRODUCTION_CELL_AMOUNT": [3],
+    "AGE_DEATH": False,
+    "AGE_SURVIVAL_CELL_AMOUNT": {},
+    "AGE_DEATH_CHANCE": 0,
+    "OLD_NEIGHBOR_WEIGHT": 1,
+    "ENGINE": "array",
+    "CYCLE_DETECTION": True,
+    "STOP_ON_CYCLE": False,
+    "CYCLE_WINDOW": 64,
+    "CENSUS_FREQ": 50,
+    "HEATMAP_BIN": 16,
+    "HEATMAP_FREQ": 1,
+    "SEED": None,
+    "MEMORY_BUDGET": 0
+}
+##### ##### ##### ##### ##### #####
+
+# Parameters that can change on a running board; the rest size the window and grid
+RULE_PARAMETERS = (
+    "MAX_AGE", "SURVIVAL_CELL_AMOUNT", "REPRODUCTION_CELL_AMOUNT", "AGE_DEATH",
+    "AGE_SURVIVAL_CELL_AMOUNT", "AGE_DEATH_CHANCE", "OLD_NEIGHBOR_WEIGHT"
+)
+RESTART_PARAMETERS = ("WIDTH", "HEIGHT", "TILE_SIZE")
+# Everything a board history depends on besides the seed
+RESULT_PARAMETERS = RESTART_PARAMETERS + RULE_PARAMETERS
+
+# Cycled with B in the window: (survival, reproduction)
+RULE_PRESETS = (
+    ([2, 3], [3]),
+    ([2, 3], [3, 6]),
+    ([4, 5, 6, 7, 8], [3, 4]),
+    ([1, 2, 3, 4, 5], [3]),
+    ([3, 4], [3, 4])
+)
+
+def load_colors(path=COLORS_FILE):
+    with open(path, "r") as color_file:
+        return json.load(color_file)
+
+def load_parameters(path=PARAMETERS_FILE):
+    with open(path, "r") as param_file:
+        return json.load(param_file)
+
+def load_metadata(path):
+    # Run metadata (run_metadata) from a window's metadata.json, a headless or ensemble --output file,
+    # or a --snapshot / heatmaps .npz
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            metadata = json.loads(str(data["metadata"]))
+    else:
+        with open(path, "r") as metadata_file:
+            metadata = json.load(metadata_file)
+        if isinstance(metadata, dict):
+            metadata = metadata.get("Metadata", metadata)
+    if not isinstance(metadata, dict) or not {"Seed", "Soup", "Engine", "Parameters"} <= set(metadata):
+        raise ValueError(f"{path} holds no run metadata")
+    return metadata
+
+def replay_parameters(metadata):
+    # The parameters, seed and engine that step a run's board history again
+    return {**metadata["Parameters"], "SEED": metadata["Seed"], "ENGINE": metadata["Engine"]}
+
+def layered_parameters(config_files=(), overrides=None, window=False, replay=None):
+    # defaultparameters.json, then the experimental block (window only), then each config file,
+    # then a replayed run's metadata, then overrides
+    params = load_parameters()
+    if window and not use_default_parameters:
+        params.update(EXPERIMENTAL_PARAMETERS)
+    for path in config_files:
+        layer = load_parameters(path)
+        if "Parameters" in layer and "Seed" in layer:
+            raise ValueError(f"{path} is a run's metadata, replay it with --replay")
+        params.update(known_parameters(layer, params, path))
+    if replay is not None:
+        params.update(known_parameters(replay_parameters(replay), params, "the replayed metadata"))
+    if overrides:
+        params.update(known_parameters(overrides, params, "the command line"))
+    validate_parameters(params)
+    return params
+
+def known_parameters(layer, params, source):
+    # A misspelled name would otherwise be layered in and never read
+    unknown = sorted(set(layer) - set(params))
+    if unknown:
+        raise ValueError(f"Unknown parameter{'s' if len(unknown) > 1 else ''} {', '.join(unknown)} in {source}")
+    return layer
+
+def window_parameters():
+    # The window runs the experimental block unless use_default_parameters is set
+    return layered_parameters(window=True)
+
+# The age plane is at most uint16 and has to hold MAX_AGE + 1
+MAX_MAX_AGE = np.iinfo(np.uint16).max - 1
+# Most a cell at MAX_AGE can count as: eight of them must still fit the uint8 neighbor counts
+MAX_NEIGHBOR_WEIGHT = 31
+# Widest heatmap block whose cell count (bin x bin) still fits the uint16 maps
+MAX_HEATMAP_BIN = 255
+
+def is_whole(value):
+    # bool is an int subclass, but true/false is never a count
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_neighbor_counts(value):
+    return isinstance(value, (list, tuple)) and all(is_whole(n) and 0 <= n <= 8 for n in value)
+
+def validate_parameters(params):
+    # Every parameter is checked here, so a bad file or flag is reported instead of failing deep inside a run
+    from .engine import ENGINES
+
+    for name in ("WIDTH", "HEIGHT", "TILE_SIZE", "FPS", "UPDATE_FREQ", "MAX_AGE", "CYCLE_WINDOW", "HEATMAP_BIN"):
+        if not is_whole(params[name]) or params[name] < 1:
+            raise ValueError(f"{name} must be a whole number of at least 1, got {params[name]!r}")
+    if params["MAX_AGE"] > MAX_MAX_AGE:
+        raise ValueError(f"MAX_AGE must be at most {MAX_MAX_AGE}, got {params['MAX_AGE']!r}")
+    # Heatmap blocks count their cells in uint16
+    if params["HEATMAP_BIN"] > MAX_HEATMAP_BIN:
+        raise ValueError(f"HEATMAP_BIN must be at most {MAX_HEATMAP_BIN}, got {params['HEATMAP_BIN']!r}")
+    for name in ("CENSUS_FREQ", "HEATMAP_FREQ"):
+        if not is_whole(params[name]) or params[name] < 0:
+            raise ValueError(f"{name} must be a whole number of generations (0 turns it off), got {params[name]!r}")
+    for name in ("AGE_DEATH", "CYCLE_DETECTION", "STOP_ON_CYCLE"):
+        if not isinstance(params[name], bool):
+            raise ValueError(f"{name} must be true or false, got {params[name]!r}")
+    for name in ("SURVIVAL_CELL_AMOUNT", "REPRODUCTION_CELL_AMOUNT"):
+        if not is_neighbor_counts(params[name]):
+            raise ValueError(f"{name} must be a list of neighbor counts from 0 to 8, got {params[name]!r}")
+
+    age_survival = params["AGE_SURVIVAL_CELL_AMOUNT"]
+    if not isinstance(age_survival, dict):
+        raise ValueError(f"AGE_SURVIVAL_CELL_AMOUNT must map ages to neighbor counts, got {age_survival!r}")
+    for age, amounts in age_survival.items():
+        # json keys are strings
+        if not (is_whole(age) or (isinstance(age, str) and age.isdigit())) or int(age) < 1:
+            raise ValueError(f"AGE_SURVIVAL_CELL_AMOUNT ages must be whole numbers of at least 1, got {age!r}")
+        if not is_neighbor_counts(amounts):
+            raise ValueError(f"AGE_SURVIVAL_CELL_AMOUNT[{age!r}] must be a list of neighbor counts from 0 to 8, got {amounts!r}")
+
+    chance = params["AGE_DEATH_CHANCE"]
+    if not isinstance(chance, (int, float)) or isinstance(chance, bool) or not 0 <= chance <= 1:
+        raise ValueError(f"AGE_DEATH_CHANCE must be between 0 and 1, got {chance!r}")
+    if not is_whole(params["OLD_NEIGHBOR_WEIGHT"]) or not 0 <= params["OLD_NEIGHBOR_WEIGHT"] <= MAX_NEIGHBOR_WEIGHT:
+        raise ValueError(f"OLD_NEIGHBOR_WEIGHT must be a whole number from 0 to {MAX_NEIGHBOR_WEIGHT}, got {params['OLD_NEIGHBOR_WEIGHT']!r}")
+    if params["SEED"] is not None and (not is_whole(params["SEED"]) or params["SEED"] < 0):
+        raise ValueError(f"SEED must be a whole number of at least 0 or null, got {params['SEED']!r}")
+    if not is_whole(params["MEMORY_BUDGET"]) or params["MEMORY_BUDGET"] < 0:
+        raise ValueError(f"MEMORY_BUDGET must be a whole number of MB (0 for no budget), got {params['MEMORY_BUDGET']!r}")
+    if params["ENGINE"] not in ENGINES:
+        raise ValueError(f"ENGINE must be one of {', '.join(ENGINES)}, got {params['ENGINE']!r}")
+
+def rule_name(params):
+    # B/S notation, e.g. B3/S23
+    born = "".join(str(n) for n in sorted(params["REPRODUCTION_CELL_AMOUNT"]))
+    survive = "".join(str(n) for n in sorted(params["SURVIVAL_CELL_AMOUNT"]))
+    return f"B{born}/S{survive}"
+
+def new_seed():
+    # Fresh entropy, small enough to read back and type in
+    return int(np.random.SeedSequence().entropy % 2 ** 63)
+
+def soup_rng(seed, soup=0):
+    # Soup number `soup` of a run, the same in the window, headless runs and every board of an ensemble
+    return np.random.default_rng([seed, soup])
+
+def step_rng(seed, soup=0):
+    # Random age deaths draw from their own stream, so generating soups never shifts them
+    return np.random.default_rng([seed, soup, 1])
+
+def fingerprint(params):
+    # Short hash of the parameters that decide a board history, engines and frame rates don't change it
+    relevant = {name: params[name] for name in RESULT_PARAMETERS}
+    relevant["AGE_SURVIVAL_CELL_AMOUNT"] = {str(age): amounts for age, amounts in relevant["AGE_SURVIVAL_CELL_AMOUNT"].items()}
+    text = json.dumps(relevant, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+def run_metadata(params, seed, soup=0):
+    # Everything needed to step the same board history again
+    return {
+        "Seed": seed,
+        "Soup": soup,
+        "Engine": params["ENGINE"],
+        "Rules": rule_name(params),
+        "Fingerprint": fingerprint(params),
+        "Parameters": {name: params[name] for name in RESULT_PARAMETERS}
+    }
+
+def metadata_text(metadata):
+    return f"SEED={metadata['Seed']}, SOUP={metadata['Soup']}, ENGINE={metadata['Engine']}, RULES={metadata['Rules']}, FINGERPRINT={metadata['Fingerprint']}"
+
+def parse_bool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError(f"expected true/false, got {value!r}")
+
+# Parameter flags shared by every entry point: --max-age 20, --survival 2 3, --age-death on ...
+PARAMETER_FLAGS = {
+    "WIDTH": {"type": int},
+    "HEIGHT": {"type": int},
+    "TILE_SIZE": {"type": int},
+    "FPS": {"type": int},
+    "UPDATE_FREQ": {"type": int},
+    "MAX_AGE": {"type": int},
+    "SURVIVAL_CELL_AMOUNT": {"type": int, "nargs": "*", "flag": "--survival"},
+    "REPRODUCTION_CELL_AMOUNT": {"type": int, "nargs": "+", "flag": "--reproduction"},
+    "AGE_DEATH": {"type": parse_bool},
+    "AGE_SURVIVAL_CELL_AMOUNT": {"type": json.loads, "flag": "--age-survival"},
+    "AGE_DEATH_CHANCE": {"type": float},
+    "OLD_NEIGHBOR_WEIGHT": {"type": int},
+    "ENGINE": {"type": str},
+    "CYCLE_DETECTION": {"type": parse_bool},
+    "STOP_ON_CYCLE": {"type": parse_bool},
+    "CYCLE_WINDOW": {"type": int},
+    "CENSUS_FREQ": {"type": int},
+    "HEATMAP_BIN": {"type": int},
+    "HEATMAP_FREQ": {"type": int},
+    "SEED": {"type": int},
+    "MEMORY_BUDGET": {"type": int}
+}
+
+def add_parameter_arguments(parser):
+    group = parser.add_argument_group("parameters", "layered over data/defaultparameters.json")
+    group.add_argument("--config", action="append", default=[], metavar="FILE", help="json parameter file, later files win")
+    group.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="any parameter as json, e.g. --set MAX_AGE=20")
+    group.add_argument("--replay", metavar="FILE", help="step an earlier run again: the parameters, seed and soup from its metadata (metadata.json, an --output file or a .npz)")
+    for name, options in PARAMETER_FLAGS.items():
+        options = dict(options)
+        flag = options.pop("flag", "--" + name.lower().replace("_", "-"))
+        group.add_argument(flag, dest=name, default=None, **options)
+
+def overrides_from_args(args):
+    overrides = {}
+    for item in args.set:
+        name, _, value = item.partition("=")
+        overrides[name.strip().upper()] = json.loads(value)
+    for name in PARAMETER_FLAGS:
+        value = getattr(args, name)
+        if value is not None:
+            overrides[name] = value
+    return overrides
+
+def replay_from_args(args):
+    return load_metadata(args.replay) if args.replay else None
+
+def replay_soup(args, replay):
+    # --soup wins over the replayed run's soup
+    if args.soup is not None:
+        return args.soup
+    return replay["Soup"] if replay is not None else 0
+
+def new_watcher(paths):
+    # Modification times of the files a run was configured from
+    return {path: modified_time(path) for path in paths}
+
+def modified_time(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def files_changed(watcher):
+    changed = False
+    for path, seen in watcher.items():
+        current = modified_time(path)
+        if current != seen:
+            watcher[path] = current
+            changed = True
+    return changed
+
+def grid_size(params):
+    return params["WIDTH"] // params["TILE_SIZE"], params["HEIGHT"] // params["TILE_SIZE"]
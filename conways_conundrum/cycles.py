@@ -0,0 +1,70 @@
+import hashlib
+from collections import deque
+import numpy as np
+
+"""
+Cycle detection for Conway's Conundrum.
+
+Every consumer of age (colors, statistics, AGE_DEATH and the rule tables) reads
+min(age, MAX_AGE), so the next generation only depends on the clamped board.
+Once a clamped board repeats, the run is periodic from then on and the future
+can be skipped to without stepping through it.
+
+"""
+
+def new_tracker(window=64):
+    return {
+        "window": window,
+        # Digests of the last `window` generations, oldest first
+        "order": deque(),
+        "seen": {},
+        "event": None
+    }
+
+def reset(tracker):
+    tracker["order"].clear()
+    tracker["seen"].clear()
+    tracker["event"] = None
+
+def digest(board, max_age):
+    return hashlib.blake2b(np.minimum(board, max_age).tobytes(), digest_size=16).digest()
+
+def observe(tracker, board, generation, max_age):
+    # Returns an event dict the first time the run settles, otherwise None
+    if tracker["event"] is not None:
+        return None
+
+    key = digest(board, max_age)
+    first_seen = tracker["seen"].get(key)
+
+    if first_seen is not None:
+        period = generation - first_seen
+        if not board.any():
+            kind = "Extinction"
+        elif period == 1:
+            kind = "Stasis"
+        else:
+            kind = "Oscillation"
+
+        tracker["event"] = {"Event": kind, "Generation": generation, "Since": first_seen, "Period": period}
+        return tracker["event"]
+
+    tracker["seen"][key] = generation
+    tracker["order"].append(key)
+    if len(tracker["order"]) > tracker["window"]:
+        del tracker["seen"][tracker["order"].popleft()]
+
+    return None
+
+def describe(event):
+    if event["Event"] == "Oscillation":
+        return f"Period {event['Period']} since gen {event['Since']}"
+    return f"{event['Event']} since gen {event['Since']}"
+
+def jump_ahead(board, event, generation, target_generation, step):
+    # Only (target - generation) mod period real steps are needed; ages past MAX_AGE
+    # fall behind the true count, so saved boards are clamped to MAX_AGE
+    remaining = (target_generation - generation) % event["Period"]
+    for _ in range(remaining):
+        board = step(board)
+    return board
@@ -0,0 +1,124 @@
+import numpy as np
+from .census import KNOWN_OBJECTS, pattern_board
+
+"""
+Board editing for Conway's Conundrum: drag brushes, rectangle fill/erase and pattern stamps.
+
+Input handlers only queue cells. Everything queued during a frame is applied in
+one batched mutation by apply_edits, to either a positions dict or a board
+array, and the touched region is returned so the renderer knows what changed.
+
+"""
+
+# Patterns placed with the stamp tool (K cycles through them), centered on the cursor
+STAMPS = {name: np.nonzero(pattern_board(pattern, 0)) for name, (pattern, _) in KNOWN_OBJECTS.items()}
+
+MAX_BRUSH = 15
+
+def new_editor():
+    return {
+        # Side length of the square brush in cells
+        "brush": 1,
+        # None paints with the brush, otherwise the STAMPS name placed on click
+        "stamp": None,
+        # 1 while a stroke paints, 0 while it erases, None between strokes
+        "stroke": None,
+        "last": None,
+        # Corner cell of a shift-drag rectangle
+        "rect_start": None,
+        # Queued (rows, cols, value) edits waiting for apply_edits
+        "pending": []
+    }
+
+def next_stamp(editor):
+    names = [None, *STAMPS]
+    editor["stamp"] = names[(names.index(editor["stamp"]) + 1) % len(names)]
+    return editor["stamp"]
+
+def resize_brush(editor, change):
+    editor["brush"] = min(MAX_BRUSH, max(1, editor["brush"] + change))
+    return editor["brush"]
+
+def queue_cells(editor, rows, cols, value):
+    editor["pending"].append((np.asarray(rows).ravel(), np.asarray(cols).ravel(), value))
+
+def brush_cells(editor, row, col):
+    # Square brush centered on the cell
+    offsets = np.arange(editor["brush"]) - (editor["brush"] - 1) // 2
+    return np.repeat(row + offsets, offsets.size), np.tile(col + offsets, offsets.size)
+
+def line_cells(start, end):
+    # Every cell on the segment, so fast drags don't leave gaps
+    (row0, col0), (row1, col1) = start, end
+    steps = max(abs(row1 - row0), abs(col1 - col0)) + 1
+    return np.linspace(row0, row1, steps).round().astype(int), np.linspace(col0, col1, steps).round().astype(int)
+
+def begin_stroke(editor, row, col, value, rectangle=False):
+    if rectangle:
+        editor["rect_start"] = (row, col)
+        editor["stroke"] = value
+        return
+
+    if editor["stamp"] is not None:
+        rows, cols = STAMPS[editor["stamp"]]
+        queue_cells(editor, rows + row - rows.max() // 2, cols + col - cols.max() // 2, 1)
+        return
+
+    editor["stroke"] = value
+    editor["last"] = (row, col)
+    queue_cells(editor, *brush_cells(editor, row, col), value)
+
+def extend_stroke(editor, row, col):
+    if editor["last"] is None or editor["rect_start"] is not None:
+        return
+
+    # Stamp the brush along the line from the last mouse position
+    line_rows, line_cols = line_cells(editor["last"], (row, col))
+    brush_rows, brush_cols = brush_cells(editor, 0, 0)
+    queue_cells(editor, line_rows[:, None] + brush_rows, line_cols[:, None] + brush_cols, editor["stroke"])
+    editor["last"] = (row, col)
+
+def end_stroke(editor, row, col):
+    if editor["rect_start"] is not None:
+        start_row, start_col = editor["rect_start"]
+        rows = np.arange(min(start_row, row), max(start_row, row) + 1)
+        cols = np.arange(min(start_col, col), max(start_col, col) + 1)
+        queue_cells(editor, np.repeat(rows, cols.size), np.tile(cols, rows.size), editor["stroke"])
+
+    editor["stroke"] = None
+    editor["last"] = None
+    editor["rect_start"] = None
+
+def apply_edits(editor, target, grid_width, grid_height):
+    # Applies everything queued this frame to a positions dict or board array in one go.
+    # Returns the touched (top, left, bottom, right) cell region, or None if nothing was queued
+    if not editor["pending"]:
+        return None
+
+    rows = np.concatenate([rows for rows, _, _ in editor["pending"]])
+    cols = np.concatenate([cols for _, cols, _ in editor["pending"]])
+    values = np.concatenate([np.full(rows.size, value, np.uint8) for rows, _, value in editor["pending"]])
+    editor["pending"].clear()
+
+    inside = (rows >= 0) & (rows < grid_height) & (cols >= 0) & (cols < grid_width)
+    rows, cols, values = rows[inside], cols[inside], values[inside]
+    if rows.size == 0:
+        return None
+
+    # Later edits of the same cell win: keep the last occurrence of each cell
+    cells = rows * grid_width + cols
+    _, last = np.unique(cells[::-1], return_index=True)
+    keep = cells.size - 1 - last
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+
+    painted = values == 1
+    if isinstance(target, np.ndarray):
+        # Painting keeps the age of cells that are already alive
+        target[rows, cols] = np.where(painted, np.maximum(target[rows, cols], 1), 0)
+    else:
+        for position in zip(cols[~painted].tolist(), rows[~painted].tolist()):
+            target.pop(position, None)
+        for position in zip(cols[painted].tolist(), rows[painted].tolist()):
+            target.setdefault(position, 1)
+
+    return int(rows.min()), int(cols.min()), int(rows.max()), int(cols.max())
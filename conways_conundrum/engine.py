@@ -0,0 +1,250 @@
+import numpy as np
+
+"""
+Engines for Conway's Conundrum.
+
+The board is a single age plane: 0 is a dead cell, anything above 0 is a live
+cell of that age. It is indexed [row, col] and has one extra row and column past
+the visible grid, because get_neighbors lets cells live one tile past
+the right/bottom edge. Keeping that margin makes both engines agree cell-for-cell.
+
+"""
+
+def age_dtype(max_age):
+    # Colors, statistics and AGE_DEATH all clamp ages to MAX_AGE, so the plane only needs to hold MAX_AGE + 1
+    return np.uint8 if max_age < 255 else np.uint16
+
+def board_shape(grid_width, grid_height):
+    return (grid_height + 1, grid_width + 1)
+
+def empty_board(grid_width, grid_height, max_age):
+    return np.zeros(board_shape(grid_width, grid_height), age_dtype(max_age))
+
+def positions_to_board(positions, board):
+    board[...] = 0
+    if positions:
+        cols, rows = np.array(list(positions.keys())).T
+        ages = np.fromiter(positions.values(), np.int64, len(positions))
+        board[rows, cols] = np.minimum(ages, np.iinfo(board.dtype).max)
+
+    return board
+
+def board_to_positions(board):
+    rows, cols = np.nonzero(board)
+    return dict(zip(zip(cols.tolist(), rows.tolist()), board[rows, cols].tolist()))
+
+def make_rules(params):
+    max_age = params["MAX_AGE"]
+    survival = params["SURVIVAL_CELL_AMOUNT"]
+    reproduction = params["REPRODUCTION_CELL_AMOUNT"]
+    # {age: survival amounts} used once a cell is at least that old (json keys are strings)
+    age_survival = {int(age): amounts for age, amounts in params.get("AGE_SURVIVAL_CELL_AMOUNT", {}).items()}
+    # Chance per generation that a cell at MAX_AGE dies, ramped linearly with age like get_color
+    death_chance = params.get("AGE_DEATH_CHANCE", 0)
+    # How many neighbors a cell at MAX_AGE counts as
+    old_weight = params.get("OLD_NEIGHBOR_WEIGHT", 1)
+
+    # Every table is indexed by min(age, MAX_AGE), so row 0 is a dead cell
+    ages = np.arange(max_age + 1)
+
+    weights = np.ones(max_age + 1, np.uint8)
+    weights[0] = 0
+    weights[max_age] = old_weight
+    max_count = 8 * max(1, old_weight)
+
+    survive = np.zeros((max_age + 1, max_count + 1), bool)
+    for age in range(1, max_age + 1):
+        amounts = survival
+        for threshold in sorted(age_survival):
+            if age >= threshold:
+                amounts = age_survival[threshold]
+        survive[age, [n for n in amounts if n <= max_count]] = True
+
+    born = np.zeros(max_count + 1, bool)
+    born[[n for n in reproduction if n <= max_count]] = True
+
+    chance = death_chance * ages / max_age
+    chance[0] = 0
+
+    return {
+        "MAX_AGE": max_age,
+        "AGE_DEATH": params["AGE_DEATH"],
+        "SURVIVAL_CELL_AMOUNT": tuple(survival),
+        "REPRODUCTION_CELL_AMOUNT": tuple(reproduction),
+        "dtype": age_dtype(max_age),
+        "weights": weights,
+        "survive": survive,
+        "born": born,
+        "death_chance": chance,
+        # Shortcuts so plain B/S runs skip the per-age lookups entirely
+        "plain_weights": old_weight == 1,
+        "plain_survival": not age_survival,
+        "random_death": death_chance > 0,
+        # The dict engine only understands the original parameters
+        "classic": old_weight == 1 and not age_survival and death_chance == 0,
+    }
+
+def step_positions(positions, rules, grid_width, grid_height):
+    # Reference engine: the original adjust_grid loop over a {(col, row): age} dict, classic rules only
+    # Stores positions of all neighbors of all live cells of the current cycle of positions
+    all_neighbors = set()
+    # Updated after adjust_grid, stores positions and age of the cells that need to be updated after cycle
+    new_positions = {}
+
+    # Loop through the position and age of all live cells
+    for position, age in positions.items(): 
+
+        # Skip cells that have reached max age, (they die)
+        if (rules["AGE_DEATH"] and age >= rules["MAX_AGE"]):
+            continue
+
+        # Get neighboring coordinates
+        neighbors = get_neighbors(position, grid_width, grid_height)
+        # Add set of coordinates to all_neighbors
+        all_neighbors.update(neighbors)
+
+        # Filter only for live cells
+        live_neighbors = list(filter(lambda x: x in positions, neighbors))
+
+        # If live cell amount is 2 or 3, (or experimental value) keep cell position; determined by the length (num) of coordinates in live_neighbors
+        if len(live_neighbors) in rules["SURVIVAL_CELL_AMOUNT"]: 
+            new_positions[position] = age + 1
+
+    # Loop through all neighbors of live cells
+    for position in all_neighbors:
+        neighbors = get_neighbors(position, grid_width, grid_height)
+        # Check live neighbors of live neighbors
+        live_neighbors = list(filter(lambda x: x in positions, neighbors))
+
+        # If they have three live neighbors (or experimental number of neighbors), alive the adjacent cell
+        if len(live_neighbors) in rules["REPRODUCTION_CELL_AMOUNT"] and position not in new_positions:
+            new_positions[position] = 1
+
+    return new_positions
+
+def get_neighbors(pos, grid_width, grid_height):
+
+    # 8 possible neighbors
+    x, y = pos
+    neighbors = []
+    # Loop through nine possible positions using x/y displacement, if 0, 0, ignore
+    for dx in [-1, 0, 1]:
+        # Avoid off-screen position (x)
+        if x + dx < 0 or x + dx > grid_width:
+            continue
+        for dy in [-1, 0, 1]:
+            # Avoid off-screen position (y)
+            if y + dy < 0 or y + dy > grid_height:
+                continue
+            if dx == 0 and dy == 0:
+                continue
+
+            neighbors.append((x + dx, y + dy))
+
+    return neighbors
+
+def count_neighbors(plane):
+    # Separable 3x3 box sum over the last two axes minus the center cell; cells past the border count as dead
+    pad = [(0, 0)] * (plane.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(plane, pad)
+    rows = padded[..., :-2, :] + padded[..., 1:-1, :] + padded[..., 2:, :]
+    return rows[..., :-2] + rows[..., 1:-1] + rows[..., 2:] - plane
+
+def random_plane(rng, shape):
+    # Uniform draws for every cell. An ensemble passes one generator per board, so a
+    # board's draws don't depend on how many boards are stacked with it
+    if isinstance(rng, (list, tuple)):
+        return np.stack([generator.random(shape[1:]) for generator in rng])
+    return rng.random(shape)
+
+def step_board(board, rules, rng=None, deaths=None):
+    # deaths, if given, is a count per age (sized to the board's age type) that dying cells are added to
+    max_age = rules["MAX_AGE"]
+    alive = board > 0
+
+    if rules["plain_weights"] and rules["plain_survival"] and not rules["random_death"]:
+        age_index = None
+    else:
+        age_index = np.minimum(board, max_age)
+
+    if rules["plain_weights"]:
+        counts = count_neighbors(alive.view(np.uint8))
+    else:
+        counts = count_neighbors(rules["weights"][age_index])
+
+    if rules["plain_survival"]:
+        survive = alive & rules["survive"][1][counts]
+    else:
+        survive = rules["survive"][age_index, counts]
+
+    # Cells at MAX_AGE die but still count as neighbors this generation, matching step_positions
+    if rules["AGE_DEATH"]:
+        active = alive & (board < max_age)
+        survive &= active
+    else:
+        active = alive
+
+    if rules["random_death"]:
+        if rng is None:
+            rng = np.random.default_rng()
+        survive &= random_plane(rng, board.shape) >= rules["death_chance"][age_index]
+
+    if deaths is not None:
+        lifetimes = np.bincount(board[alive & ~survive])
+        deaths[:lifetimes.size] += lifetimes
+
+    born = rules["born"][counts] & ~survive
+    # step_positions only considers births next to a cell that is still active, which
+    # plain counting already guarantees unless some live cells don't seed neighbors
+    if rules["AGE_DEATH"] or rules["born"][0] or not rules["plain_weights"]:
+        born &= count_neighbors(active.view(np.uint8)) > 0
+
+    # Saturating age increment so long-lived cells never wrap back to 0
+    limit = np.iinfo(board.dtype).max
+    older = np.minimum(board, limit - 1) + 1
+    return np.where(survive, older, born.astype(board.dtype))
+
+def step_dict(board, rules, rng=None, deaths=None):
+    # The reference engine on a board, through a positions dict and back (one board at a time for a stack)
+    if board.ndim > 2:
+        return np.stack([step_dict(plane, rules, rng, deaths) for plane in board])
+
+    grid_height, grid_width = board.shape[0] - 1, board.shape[1] - 1
+    positions = step_positions(board_to_positions(board), rules, grid_width, grid_height)
+    result = positions_to_board(positions, np.zeros_like(board))
+
+    if deaths is not None:
+        # Survivors are exactly one generation older (saturating), anything else died, possibly reborn at 1
+        limit = np.iinfo(board.dtype).max
+        alive = board > 0
+        survived = alive & (result == np.minimum(board, limit - 1) + 1)
+        lifetimes = np.bincount(board[alive & ~survived])
+        deaths[:lifetimes.size] += lifetimes
+    return result
+
+def step_jit(board, rules, rng=None, deaths=None):
+    # The fused numba kernel in jit.py, which falls back to step_board when numba isn't installed
+    from . import jit
+    return jit.step_board(board, rules, rng, deaths)
+
+def check_engine(name, rules):
+    # The dict engine only knows the original parameters, the window falls back to array for the rest
+    if name == "dict" and not rules["classic"]:
+        raise ValueError("ENGINE dict only runs the original rules (no AGE_SURVIVAL_CELL_AMOUNT, AGE_DEATH_CHANCE or OLD_NEIGHBOR_WEIGHT), use array or jit")
+
+def stepper(name, rules):
+    # step(board, rng=None, deaths=None) for a run loop on ENGINE `name`. The jit one reuses
+    # two boards, so a board it returned is only valid until the step after next
+    check_engine(name, rules)
+    if name == "jit":
+        from . import jit
+        return jit.stepper(rules)
+    step = ENGINES[name]
+    return lambda board, rng=None, deaths=None: step(board, rules, rng, deaths)
+
+# Every engine steps a board with the same (board, rules, rng) signature
+ENGINES = {
+    "dict": step_dict,
+    "array": step_board,
+    "jit": step_jit
+}
@@ -0,0 +1,198 @@
+import argparse
+import json
+import math
+import time
+import numpy as np
+from . import config
+from . import engine
+from . import cache
+from . import memory
+from . import headless
+from . import recording
+
+"""
+Ensemble runs of Conway's Conundrum: many independent boards stepped as one.
+
+The boards are stacked into a single (N, rows, cols) array. step_board and
+count_neighbors only look at the last two axes, so the whole ensemble goes
+through the same vectorized operations as one board and the per-call overhead
+is paid once per generation instead of once per board. Boards never touch each
+other: every one keeps its own dead margin.
+
+    python -m conways_conundrum.ensemble --boards 256 --width 64 --height 64 --tile-size 1 --show
+
+"""
+
+def generate_boards(params, count, seed):
+    # Board k is soup k of the seed, the same board `headless --seed S --soup k` starts from
+    return np.stack([headless.generate_board(params, config.soup_rng(seed, soup)) for soup in range(count)])
+
+def step_rngs(count, seed):
+    # Board k's random age deaths match a headless run of soup k
+    return [config.step_rng(seed, soup) for soup in range(count)]
+
+def ensemble_statistics(boards, ceiling, total_cells, previous_live_cell_count):
+    # Per-board version of headless.board_statistics, ceiling is a MAX_AGE plane shaped like one board
+    num_live_cells = np.count_nonzero(boards, axis=(1, 2))
+    total_age = np.minimum(boards, ceiling).sum(axis=(1, 2), dtype=np.int64)
+    average_age = np.divide(total_age, num_live_cells, out=np.zeros(len(boards)), where=num_live_cells > 0)
+    # Divided before scaling, as headless does, so per-board rates match its rounding
+    survival_rate = np.divide(num_live_cells, previous_live_cell_count, out=np.zeros(len(boards)), where=previous_live_cell_count > 0) * 100
+    return num_live_cells, num_live_cells / total_cells, average_age, survival_rate
+
+def run(params, count, generations, seed=None, boards=None, on_generation=None):
+    # on_generation(boards, generation) is called after every generation, returning False stops the run
+    if seed is None:
+        seed = config.new_seed()
+    if boards is None:
+        boards = generate_boards(params, count, seed)
+    rng = step_rngs(len(boards), seed)
+
+    rules = engine.make_rules(params)
+    step = engine.stepper(params.get("ENGINE", "array"), rules)
+    grid_width, grid_height = config.grid_size(params)
+    total_cells = grid_width * grid_height
+    ceiling = np.full(boards.shape[1:], params["MAX_AGE"], boards.dtype)
+
+    # Every column is (generations + 1, boards), in memory-mapped files when that would take over half the memory budget
+    spill = memory.spill_directory(params.get("MEMORY_BUDGET", 0), (generations + 1) * len(boards) * 8 * (len(headless.STATISTICS_COLUMNS) - 1))
+    history = {name: memory.allocate((generations + 1, len(boards)), float, spill) for name in headless.STATISTICS_COLUMNS[1:]}
+    history["Generation"] = np.arange(generations + 1)
+
+    previous = np.zeros(len(boards), np.int64)
+    start = time.perf_counter()
+    generation = 0
+    while True:
+        row = ensemble_statistics(boards, ceiling, total_cells, previous)
+        for name, values in zip(headless.STATISTICS_COLUMNS[1:], row):
+            history[name][generation] = values
+        previous = row[0]
+
+        if on_generation is not None and on_generation(boards, generation) is False:
+            break
+        if generation == generations:
+            break
+
+        boards = step(boards, rng)
+        generation += 1
+
+    return {
+        "Seed": seed,
+        "Generation": generation,
+        "Seconds": time.perf_counter() - start,
+        "History": {name: column[:generation + 1] for name, column in history.items()},
+        "Boards": boards
+    }
+
+def tile_boards(boards, grid_width, grid_height, columns=None, gap=1):
+    # One age plane holding the visible part of every board on a grid, gap dead cells apart
+    count = len(boards)
+    columns = columns or math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    tiled = np.zeros((rows * (grid_height + gap) - gap, columns * (grid_width + gap) - gap), boards.dtype)
+    for index, board in enumerate(boards):
+        top = index // columns * (grid_height + gap)
+        left = index % columns * (grid_width + gap)
+        tiled[top:top + grid_height, left:left + grid_width] = board[:grid_height, :grid_width]
+    return tiled
+
+def show(params, count, generations, seed, window_size=1000):
+    # Steps the ensemble while drawing every board as a thumbnail, space pauses, closing the window stops
+    import pygame
+
+    grid_width, grid_height = config.grid_size(params)
+    colors = config.load_colors()
+    table = recording.palette(colors, params["MAX_AGE"])
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    tiled_width = columns * (grid_width + 1) - 1
+    tiled_height = rows * (grid_height + 1) - 1
+    scale = max(1, window_size // max(tiled_width, tiled_height))
+
+    # Pixels between thumbnails, drawn as separator lines
+    cells = tile_boards(np.ones((count, grid_height, grid_width), np.uint8), grid_width, grid_height, columns)
+    gaps = (cells == 0).repeat(scale, axis=0).repeat(scale, axis=1)
+
+    pygame.init()
+    screen = pygame.display.set_mode((tiled_width * scale, tiled_height * scale))
+    clock = pygame.time.Clock()
+    state = {"playing": True}
+
+    def on_generation(boards, generation):
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                    state["playing"] = not state["playing"]
+
+            frame = recording.render_frame(tile_boards(boards, grid_width, grid_height, columns), table, scale)
+            frame[gaps, :3] = colors["DIMGRAY"]
+            # surfarray is indexed [x, y]
+            pygame.surfarray.blit_array(screen, frame[..., :3].transpose(1, 0, 2))
+            pygame.display.set_caption(f"Conway's Conundrum - {count} Boards - Generation {generation}")
+            pygame.display.update()
+            clock.tick(params["FPS"])
+            if state["playing"]:
+                return True
+
+    result = run(params, count, generations, seed, on_generation=on_generation)
+    pygame.quit()
+    return result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Step many independent boards of Conway's Conundrum as one array")
+    parser.add_argument("--boards", type=int, default=64)
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument("--show", action="store_true", help="draw every board as a thumbnail while stepping")
+    parser.add_argument("--output", help="write the per-board statistics history to this json file")
+    parser.add_argument("--no-cache", action="store_true", help="always step, without reading or writing the result cache")
+    config.add_parameter_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        # Boards are always soups 0 to --boards - 1 of the seed, a replayed soup number is not used
+        replay = config.replay_from_args(args)
+        params = config.layered_parameters(args.config, config.overrides_from_args(args), replay=replay)
+        engine.check_engine(params["ENGINE"], engine.make_rules(params))
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"error: {error}")
+
+    seed = params["SEED"] if params["SEED"] is not None else config.new_seed()
+    metadata = config.run_metadata(params, seed)
+    print(config.metadata_text(metadata))
+
+    # The statistics of an identical ensemble come from the result cache, --show always steps
+    key = cache.cache_key("ensemble", params, seed, args.boards, args.generations)
+    summary = None if args.no_cache or args.show else cache.lookup(key)
+    cached = summary is not None
+    if not cached:
+        if args.show:
+            result = show(params, args.boards, args.generations, seed)
+        else:
+            result = run(params, args.boards, args.generations, seed)
+        summary = {name: result[name] for name in ("Generation", "Seconds", "History")}
+        # A closed window stops early, only complete runs are kept
+        if not args.no_cache and result["Generation"] == args.generations:
+            cache.store(key, summary, metadata, "ensemble", args.generations)
+
+    history = summary["History"]
+    board_generations = args.boards * summary["Generation"]
+    rate = f"{board_generations / max(summary['Seconds'], 1e-9):.0f} board-gens/sec"
+    print(f"Generation: {summary['Generation']} x {args.boards} boards in {summary['Seconds']:.2f}s ({'cached, ' if cached else ''}{rate})")
+    live_cells = history["Live Cells"][-1]
+    print(f"Live Cells: mean {live_cells.mean():.1f}, min {int(live_cells.min())}, max {int(live_cells.max())}, extinct {int((live_cells == 0).sum())}")
+    print(f"Population Density: mean {history['Population Density'][-1].mean():.2%}")
+    print(f"Average Age: mean {history['Average Age'][-1].mean():.2f} Gens")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({
+                "Metadata": metadata,
+                "History": {name: column.tolist() for name, column in history.items()}
+            }, output_file)
+
+if __name__ == "__main__":
+    main()
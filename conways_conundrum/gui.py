@@ -0,0 +1,1038 @@
+import argparse
+import json
+import random
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pygame
+from . import config
+from . import engine
+from . import cycles
+from . import census
+from . import profiling
+from . import plots
+from . import recording
+from . import editing
+from . import heatmaps
+from . import ages
+from . import headless
+from . import history
+from . import memory
+
+"""
+Rules of Conway's Game of Life:
+
+1. A live cell with less than two live neighbors dies (underpopulation).
+2. A live cell with two or three live neighbors lives (survival).
+3. A live cell with more than three live neighbors dies (overpopulation).
+4. A dead cell with exactly three live neighbors becomes alive (reproduction).
+
+"""
+
+# Overlays cycled with M, None shows the plain board
+HEATMAP_KINDS = (None, "Density", "Average Age", "Activity")
+
+# Everything below is filled in by setup(), importing this module has no side effects
+COLORS = None
+screen = None
+clock = None
+
+def setup(params=None, colors=None, config_files=(), overrides=None, replay=None):
+    global COLORS, WIDTH, HEIGHT, TILE_SIZE, LINE_COLOR, BG_COLOR, GRID_WIDTH, GRID_HEIGHT, TOTAL_CELLS
+    global SEED, soup, edited, PARAMS, CONFIG_FILES, OVERRIDES, REPLAY, watcher, board, rng, statistics_history
+    global cycle_tracker, heatmap_tracker, heatmap_kind, age_tracker, profiler, recorder, editor, dirty, notice, screen, clock
+    global memory_report, FONTS
+
+    COLORS = colors if colors is not None else config.load_colors()
+    CONFIG_FILES = list(config_files)
+    OVERRIDES = dict(overrides or {})
+    REPLAY = replay
+    params = params if params is not None else config.layered_parameters(CONFIG_FILES, OVERRIDES, window=True, replay=REPLAY)
+
+    # Sizing the window and grid needs a restart, everything else goes through apply_parameters
+    WIDTH = params["WIDTH"]
+    HEIGHT = params["HEIGHT"]
+    TILE_SIZE = params["TILE_SIZE"]
+
+    # CONTROL PARAMETERS
+    LINE_COLOR = tuple(COLORS["LINE_COLOR"])
+    BG_COLOR = tuple(COLORS["BLACK"])
+    GRID_WIDTH, GRID_HEIGHT = config.grid_size(params)
+    TOTAL_CELLS = GRID_WIDTH * GRID_HEIGHT
+
+    # SEEDING (G steps through the soups of SEED, edits since then are flagged in saved results).
+    # A replayed run's first G generates its soup
+    SEED = None
+    soup = replay["Soup"] - 1 if replay is not None else -1
+    edited = False
+
+    # HOT RELOAD (the parameter file and every --config file are polled while running)
+    PARAMS = None
+    watcher = config.new_watcher([config.PARAMETERS_FILE, *CONFIG_FILES])
+    notice = None
+
+    # ARRAY ENGINE
+    board = None
+    rng = config.step_rng(0)
+
+    # STATISTICS TRACKER (one column per statistic)
+    statistics_history = history.new_history()
+
+    # CYCLE TRACKER
+    cycle_tracker = None
+
+    # SPATIAL STATISTICS (block heatmaps, shown over the board with M)
+    heatmap_tracker = None
+    heatmap_kind = 0
+
+    # AGE DISTRIBUTION (histogram per generation, lifetimes at death)
+    age_tracker = None
+
+    # PERFORMANCE HUD (off until toggled, timing calls are no-ops while off)
+    profiler = profiling.new_profiler()
+
+    # VIDEO RECORDING (started and stopped with R)
+    recorder = None
+
+    # EDITING (screen rects changed this frame, None when the whole screen has to be pushed)
+    editor = editing.new_editor()
+    dirty = None
+
+    # MEMORY BUDGET (resident/spilled bytes per structure, refreshed about once a second)
+    memory_report = None
+
+    # Loaded fonts by size, a font file is only read once per window
+    FONTS = {}
+
+    apply_parameters(params)
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+
+def apply_parameters(params):
+    # Swap parameters on a running board, only rebuilding what the changed keys feed
+    global PARAMS, FPS, UPDATE_FREQ, MAX_AGE, SURVIVAL_CELL_AMOUNT, REPRODUCTION_CELL_AMOUNT, AGE_DEATH
+    global AGE_SURVIVAL_CELL_AMOUNT, AGE_DEATH_CHANCE, OLD_NEIGHBOR_WEIGHT, ENGINE, CYCLE_DETECTION, STOP_ON_CYCLE
+    global CYCLE_WINDOW, CENSUS_FREQ, HEATMAP_FREQ, RULES, PALETTE, board, cycle_tracker, track_cycles, heatmap_tracker
+    global age_tracker, SEED, MEMORY_BUDGET, STEP
+
+    previous = PARAMS or {}
+    changed = [name for name in params if params[name] != previous.get(name)]
+    PARAMS = params
+
+    FPS = params["FPS"]
+    UPDATE_FREQ = params["UPDATE_FREQ"]
+    ENGINE = params["ENGINE"]
+    CYCLE_DETECTION = params["CYCLE_DETECTION"]
+    STOP_ON_CYCLE = params["STOP_ON_CYCLE"]
+    CENSUS_FREQ = params["CENSUS_FREQ"]
+    MEMORY_BUDGET = params["MEMORY_BUDGET"]
+
+    # A new SEED is used from the next generated soup
+    if SEED is None or "SEED" in changed:
+        SEED = params["SEED"] if params["SEED"] is not None else config.new_seed()
+
+    # Rule tables, and the scratch board when MAX_AGE needs a wider age type
+    if any(name in changed for name in config.RULE_PARAMETERS):
+        MAX_AGE = params["MAX_AGE"]
+        SURVIVAL_CELL_AMOUNT = tuple(params["SURVIVAL_CELL_AMOUNT"])
+        REPRODUCTION_CELL_AMOUNT = tuple(params["REPRODUCTION_CELL_AMOUNT"])
+        AGE_DEATH = params["AGE_DEATH"]
+        AGE_SURVIVAL_CELL_AMOUNT = params["AGE_SURVIVAL_CELL_AMOUNT"]
+        AGE_DEATH_CHANCE = params["AGE_DEATH_CHANCE"]
+        OLD_NEIGHBOR_WEIGHT = params["OLD_NEIGHBOR_WEIGHT"]
+        RULES = engine.make_rules(params)
+        if board is None or board.dtype != RULES["dtype"]:
+            board = engine.empty_board(GRID_WIDTH, GRID_HEIGHT, MAX_AGE)
+
+    # Board step function for the array and jit engines, and for rules the dict engine can't run
+    if "ENGINE" in changed or any(name in changed for name in config.RULE_PARAMETERS):
+        STEP = engine.stepper("jit" if ENGINE == "jit" else "array", RULES)
+
+    # Cell colors only depend on MAX_AGE, and a larger MAX_AGE needs more age and lifetime bins
+    if "MAX_AGE" in changed:
+        PALETTE = [get_color(age) for age in range(MAX_AGE + 1)]
+        if age_tracker is None:
+            age_tracker = ages.new_tracker(MAX_AGE, statistics_history["spill"])
+        else:
+            ages.resize(age_tracker, MAX_AGE)
+
+    # A repeat under the old rules says nothing about the new ones
+    if "CYCLE_WINDOW" in changed:
+        CYCLE_WINDOW = params["CYCLE_WINDOW"]
+        cycle_tracker = cycles.new_tracker(CYCLE_WINDOW)
+    elif any(name in changed for name in config.RULE_PARAMETERS):
+        cycles.reset(cycle_tracker)
+
+    # Random age deaths never repeat, so cycle tracking stays off for them
+    track_cycles = CYCLE_DETECTION and not RULES["random_death"]
+
+    # A new bin size starts a new heatmap series, a new frequency carries on with the old one
+    HEATMAP_FREQ = params["HEATMAP_FREQ"]
+    if not HEATMAP_FREQ:
+        heatmap_tracker = None
+    elif heatmap_tracker is None or "HEATMAP_BIN" in changed:
+        heatmap_tracker = heatmaps.new_tracker(GRID_WIDTH, GRID_HEIGHT, params["HEATMAP_BIN"], HEATMAP_FREQ, statistics_history["spill"])
+    else:
+        heatmap_tracker["every"] = HEATMAP_FREQ
+
+    # Returns the changed keys that only take effect after a restart
+    return [name for name in config.RESTART_PARAMETERS if name in changed and name in previous]
+
+def reload_parameters():
+    # Re-layer the parameter files and command-line flags, keeping the old parameters if the new ones are invalid
+    try:
+        params = config.layered_parameters(CONFIG_FILES, OVERRIDES, window=True, replay=REPLAY)
+        restart = apply_parameters(params)
+    except (OSError, ValueError, KeyError, TypeError, OverflowError) as error:
+        show_notice(f"Config Not Loaded: {error}")
+        print(f"Config not loaded: {error}")
+        return
+
+    if restart:
+        show_notice(f"Restart To Apply {', '.join(restart)}")
+    else:
+        show_notice(f"Config Loaded: {config.rule_name(PARAMS)}")
+
+def change_parameter(name, value):
+    params = dict(PARAMS, **{name: value})
+    try:
+        config.validate_parameters(params)
+    except ValueError:
+        return
+
+    apply_parameters(params)
+    show_notice(f"{name}: {value}")
+
+def next_rule_preset():
+    rule = (list(SURVIVAL_CELL_AMOUNT), list(REPRODUCTION_CELL_AMOUNT))
+    presets = config.RULE_PRESETS
+    index = presets.index(rule) + 1 if rule in presets else 0
+    survival, reproduction = presets[index % len(presets)]
+    apply_parameters(dict(PARAMS, SURVIVAL_CELL_AMOUNT=survival, REPRODUCTION_CELL_AMOUNT=reproduction))
+    show_notice(f"Rules: {config.rule_name(PARAMS)}")
+
+def show_notice(message, duration=2):
+    # Unlike display_message this doesn't block the loop, draw_notice shows it until it expires
+    global notice
+    notice = (message, time.time() + duration)
+
+def draw_notice():
+    global notice
+    if notice is None:
+        return
+
+    message, expires = notice
+    if time.time() > expires:
+        notice = None
+        return
+
+    font = get_font(20)
+    text = font.render(message, True, tuple(COLORS["RED"]))
+    screen.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT - 30)))
+
+def get_color(age):
+    rainbow = (random.randrange(0, 255), random.randrange(0, 255), random.randrange(0, 255))
+
+    young_color = tuple(COLORS["BLACK"])
+    old_color = tuple(COLORS["FUCHSIA"])
+
+    age = min(age, MAX_AGE)
+
+    ratio = age / MAX_AGE
+    color = (
+        int(young_color[0] * (1 - ratio) + old_color[0] * ratio),
+        int(young_color[1] * (1 - ratio) + old_color[1] * ratio),
+        int(young_color[2] * (1 - ratio) + old_color[2] * ratio)
+    )
+
+    return color
+
+def generate():
+    # The next soup of SEED, the same board `headless --seed SEED --soup N` starts from
+    global soup, edited, rng
+    soup += 1
+    edited = False
+    rng = config.step_rng(SEED, soup)
+    return engine.board_to_positions(headless.generate_board(PARAMS, config.soup_rng(SEED, soup)))
+
+def new_segment():
+    # A new soup or a cleared board starts generation 0 again, so the statistics start over too:
+    # every saved series then covers one board with its generations in order
+    history.clear(statistics_history)
+    ages.clear(age_tracker)
+    cycles.reset(cycle_tracker)
+    if heatmap_tracker is not None:
+        heatmaps.clear(heatmap_tracker)
+
+def run_metadata():
+    # Seed, soup and config fingerprint of the board on screen
+    metadata = config.run_metadata(PARAMS, SEED, soup)
+    metadata["Edited"] = edited
+    return metadata
+
+def cycle_heatmap():
+    global heatmap_kind
+    if heatmap_tracker is None:
+        show_notice("Heatmaps Off (HEATMAP_FREQ)")
+        return
+
+    heatmap_kind = (heatmap_kind + 1) % len(HEATMAP_KINDS)
+    show_notice(f"Heatmap: {HEATMAP_KINDS[heatmap_kind] or 'Off'}", duration=1)
+
+def draw_heatmap():
+    # Latest sample blended over the board, scaled to its own maximum
+    if heatmap_tracker is None or not heatmap_kind:
+        return
+
+    values = heatmaps.heatmap(heatmap_tracker, HEATMAP_KINDS[heatmap_kind])
+    if values is None:
+        return
+
+    ratio = (values / (values.max() or 1))[..., None]
+    low = np.array(COLORS["NAVY"])
+    high = np.array(COLORS["YELLOW"])
+    rgb = (low * (1 - ratio) + high * ratio).astype(np.uint8)
+
+    # surfarray is indexed [x, y]
+    surface = pygame.surfarray.make_surface(rgb.transpose(1, 0, 2))
+    size = heatmap_tracker["bin"] * TILE_SIZE
+    surface = pygame.transform.scale(surface, (values.shape[1] * size, values.shape[0] * size))
+    surface.set_alpha(150)
+    screen.blit(surface, (0, 0))
+
+def draw_grid(positions, show_grid):
+    for position, age in positions.items():
+        col, row = position
+        top_left = (col * TILE_SIZE, row * TILE_SIZE)
+        color = PALETTE[min(age, MAX_AGE)]
+        pygame.draw.rect(screen, color, (*top_left, TILE_SIZE, TILE_SIZE))
+
+    if show_grid:
+        for row in range(GRID_HEIGHT):
+            pygame.draw.line(screen, LINE_COLOR, (0, row * TILE_SIZE), (WIDTH, row * TILE_SIZE))
+
+        for col in range(GRID_WIDTH):
+            pygame.draw.line(screen, LINE_COLOR, (col * TILE_SIZE, 0), (col * TILE_SIZE, HEIGHT))  
+
+def adjust_grid(positions):
+    # The age-aware rule variants only exist in the board engines (array and jit)
+    if ENGINE != "dict" or not RULES["classic"]:
+        engine.positions_to_board(positions, board)
+        return engine.board_to_positions(STEP(board, rng, age_tracker["deaths"]))
+
+    new_positions = engine.step_positions(positions, RULES, GRID_WIDTH, GRID_HEIGHT)
+    # Survivors are exactly one generation older, anything else died (possibly reborn at 1)
+    ages.add_deaths(age_tracker, [age for position, age in positions.items() if new_positions.get(position) != age + 1])
+    return new_positions
+
+def save_statistics_plot():
+    if not statistics_history["count"]:
+        return
+
+    base_dir = config.STATISTICS_DIR
+
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+        print(f"Created base directory: {base_dir}")
+        
+    stats_dir = os.path.join(base_dir, f'statistics_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+
+    if not os.path.exists(stats_dir):
+        os.makedirs(stats_dir)
+        print(f"Created statistics directory: {stats_dir}")
+
+    metadata = run_metadata()
+    parameters_text = f"Parameters: WIDTH={WIDTH}, HEIGHT={HEIGHT}, TILE_SIZE={TILE_SIZE}, UPDATE_FREQ={UPDATE_FREQ}, MAX_AGE={MAX_AGE}, SURVIVAL={SURVIVAL_CELL_AMOUNT}, REPRODUCTION={REPRODUCTION_CELL_AMOUNT}, AGE_DEATH={AGE_DEATH}, {config.metadata_text(metadata)}"
+
+    plots.save_plots(history.columns(statistics_history), stats_dir, parameters_text, ages.series(age_tracker))
+
+    with open(os.path.join(stats_dir, "metadata.json"), "w") as metadata_file:
+        json.dump(metadata, metadata_file, indent=4)
+
+    if heatmap_tracker is not None:
+        heatmaps.export(heatmap_tracker, os.path.join(stats_dir, "heatmaps.npz"), metadata)
+
+    screenshot_name = f'screenshot_{datetime.now().strftime("%Y%m%d_%H%M%S")}_{metadata["Fingerprint"]}.png'
+    screenshot_filename1 = os.path.join(config.SCREENSHOTS_DIR, screenshot_name)
+    screenshot_filename2 = os.path.join(stats_dir, screenshot_name)
+    pygame.image.save(screen, screenshot_filename1)
+    pygame.image.save(screen, screenshot_filename2)
+
+    display_message("Data + Screenshot Saved", duration=2)
+
+def get_font(size):
+    if size not in FONTS:
+        FONTS[size] = pygame.font.Font(config.FONT_FILE, size)
+    return FONTS[size]
+
+def display_message(message, duration=2):
+    font_size = 40
+    font = get_font(font_size)
+    text = font.render(message, True, tuple(COLORS["RED"]))
+    text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
+
+    start_time = time.time()
+    while time.time() - start_time < duration:
+        screen.blit(text, text_rect)
+        pygame.display.update()
+        clock.tick(FPS)
+
+def calculate_statistics(positions, generation_count, previous_live_cell_count, census_counts=None):
+    # One histogram gives the live cells and total age, and is kept once per generation
+    histogram = ages.position_histogram(positions, MAX_AGE)
+    if not age_tracker["count"] or age_tracker["generations"][age_tracker["count"] - 1] != generation_count:
+        ages.record(age_tracker, histogram, generation_count)
+
+    num_live_cells, total_age = ages.summarize(histogram, MAX_AGE)
+    population_density = num_live_cells / (GRID_WIDTH * GRID_HEIGHT)
+    average_age = total_age / num_live_cells if num_live_cells > 0 else 0
+    survival_rate = (num_live_cells / previous_live_cell_count) * 100 if previous_live_cell_count > 0 else 0
+
+    statistics = {
+        "Rules": config.rule_name(PARAMS),
+        "Seed": f"{SEED} / Soup {soup}" + (" (Edited)" if edited else ""),
+        "Generation": generation_count,
+        "Live Cells": num_live_cells,
+        "Population Density": f"{population_density:.2%}",
+        "Average Age": f"{average_age:.2f} Gens",
+        "Survival Rate": f"{survival_rate:.2f}%"
+    }
+
+    if cycle_tracker["event"] is not None:
+        statistics["Cycle"] = cycles.describe(cycle_tracker["event"])
+
+    if memory_report is not None:
+        statistics.update(memory.describe(memory_report, MEMORY_BUDGET))
+
+    display_statistics = {
+        "Generation": generation_count,
+        "Live Cells": num_live_cells,
+        "Population Density": population_density,
+        "Average Age": average_age, 
+        "Survival Rate": survival_rate
+    }
+
+    # Object counts only exist on census generations
+    if census_counts is not None:
+        display_statistics.update(census_counts)
+
+    # One row per generation, however many frames it stays on screen
+    recorded = history.columns(statistics_history).get("Generation")
+    if recorded is None or recorded[-1] != generation_count:
+        history.append(statistics_history, display_statistics)
+    return statistics
+
+def check_memory(positions):
+    # Sizes every major structure, and when that is over MEMORY_BUDGET drops the profiler's
+    # trace and moves the history stores into memory-mapped files
+    global memory_report
+    memory_report = measure_memory(positions)
+    if not memory.over_budget(memory_report, MEMORY_BUDGET):
+        return
+
+    profiler["trace"].clear()
+    if statistics_history["spill"] is None:
+        history.spill(statistics_history)
+        ages.spill(age_tracker, statistics_history["spill"])
+        if heatmap_tracker is not None:
+            heatmaps.spill(heatmap_tracker, statistics_history["spill"])
+        show_notice("Memory Budget: History Moved To Disk")
+    memory_report = measure_memory(positions)
+
+def measure_memory(positions):
+    report = memory.account({
+        "Engine": [positions, board, cycle_tracker],
+        "History": [statistics_history, age_tracker, heatmap_tracker],
+        "Caches": [profiler, PALETTE, editor]
+    })
+    report["Recording"] = (recording.buffered_bytes(recorder) if recorder is not None else 0, 0)
+    return report
+
+def handle_events(running, playing, show_grid, show_stats, show_controls, show_intro, positions, generation, count, events):
+    global edited
+    for event in events:
+        if event.type == pygame.QUIT:
+            running = False
+
+        # Left drag paints (erasing when it starts on a live cell, so a click still toggles), right drag erases,
+        # shift-drag fills/erases a rectangle. Edits are queued and applied together after the loop
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3):
+            col, row = event.pos[0] // TILE_SIZE, event.pos[1] // TILE_SIZE
+            value = 0 if event.button == 3 or (col, row) in positions else 1
+            editing.begin_stroke(editor, row, col, value, rectangle=bool(pygame.key.get_mods() & pygame.KMOD_SHIFT))
+            continue
+
+        if event.type == pygame.MOUSEMOTION:
+            if editor["stroke"] is not None:
+                editing.extend_stroke(editor, event.pos[1] // TILE_SIZE, event.pos[0] // TILE_SIZE)
+            continue
+
+        if event.type == pygame.MOUSEBUTTONUP and event.button in (1, 3):
+            editing.end_stroke(editor, event.pos[1] // TILE_SIZE, event.pos[0] // TILE_SIZE)
+            continue
+
+        # Anything else may change what is on screen
+        mark_dirty(None)
+
+        if event.type == pygame.KEYDOWN:
+            # Press space to pause/play
+            if event.key == pygame.K_SPACE:
+                playing = not playing
+
+            # Press c to clear board
+            if event.key == pygame.K_c:
+                positions = {}
+                edited = True
+                playing = False
+                new_segment()
+                count = 0
+                generation = 0
+
+            # Press g to generate cells
+            if event.key == pygame.K_g:
+                positions = generate()
+                new_segment()
+                generation = 0
+
+            # Press h to toggle grid on/off
+            if event.key == pygame.K_h:
+                show_grid = not show_grid
+
+            # Press s to toggle game statistics panel
+            if event.key == pygame.K_s:
+                show_stats = not show_stats
+
+            # Press t to toggle controls menu
+            if event.key == pygame.K_t:
+                show_controls = not show_controls
+
+            # Press e to toggle intro menu
+            if event.key == pygame.K_e:
+                show_intro = not show_intro
+
+            # Press x to save statistics plot
+            if event.key == pygame.K_x:
+                save_statistics_plot()
+
+            # Press p to toggle performance HUD
+            if event.key == pygame.K_p:
+                profiling.toggle(profiler)
+
+            # Press o to export a performance trace
+            if event.key == pygame.K_o:
+                save_performance_trace()
+
+            # Press r to start/stop recording a video
+            if event.key == pygame.K_r:
+                toggle_recording()
+
+            # Press up/down to change MAX_AGE
+            if event.key == pygame.K_UP:
+                change_parameter("MAX_AGE", MAX_AGE + 1)
+            if event.key == pygame.K_DOWN:
+                change_parameter("MAX_AGE", MAX_AGE - 1)
+
+            # Press right/left to step faster/slower (UPDATE_FREQ is frames per generation)
+            if event.key == pygame.K_RIGHT:
+                change_parameter("UPDATE_FREQ", UPDATE_FREQ - 1)
+            if event.key == pygame.K_LEFT:
+                change_parameter("UPDATE_FREQ", UPDATE_FREQ + 1)
+
+            # Press a to toggle age death
+            if event.key == pygame.K_a:
+                change_parameter("AGE_DEATH", not AGE_DEATH)
+
+            # Press b to cycle through rule presets
+            if event.key == pygame.K_b:
+                next_rule_preset()
+
+            # Press l to reload the parameter files
+            if event.key == pygame.K_l:
+                reload_parameters()
+
+            # Press [ / ] to shrink/grow the brush
+            if event.key == pygame.K_LEFTBRACKET:
+                show_notice(f"Brush: {editing.resize_brush(editor, -1)}", duration=1)
+            if event.key == pygame.K_RIGHTBRACKET:
+                show_notice(f"Brush: {editing.resize_brush(editor, 1)}", duration=1)
+
+            # Press m to cycle heatmap overlays
+            if event.key == pygame.K_m:
+                cycle_heatmap()
+
+            # Press k to cycle through pattern stamps
+            if event.key == pygame.K_k:
+                show_notice(f"Stamp: {editing.next_stamp(editor) or 'Off'}", duration=1)
+
+    # Every edit from this frame lands in one batch
+    region = editing.apply_edits(editor, positions, GRID_WIDTH, GRID_HEIGHT)
+    if region is not None:
+        edited = True
+        cycles.reset(cycle_tracker)
+        top, left, bottom, right = region
+        mark_dirty(pygame.Rect(left * TILE_SIZE, top * TILE_SIZE, (right - left + 1) * TILE_SIZE, (bottom - top + 1) * TILE_SIZE))
+
+    return running, playing, show_grid, show_stats, show_controls, show_intro, positions, generation, count
+
+def mark_dirty(rect):
+    # rect None means the whole screen
+    global dirty
+    if rect is None or dirty is None:
+        dirty = None
+    else:
+        dirty.append(rect)
+
+def manage_panels(show_stats, show_controls, show_intro, statistics):
+    if show_stats:
+        draw_statistics(statistics)
+
+    if show_controls:
+        draw_controls()
+
+    if show_intro:
+        draw_introduction()
+
+    if profiler["enabled"]:
+        draw_performance(statistics)
+
+    draw_notice()
+
+def toggle_recording():
+    global recorder
+
+    if recorder is not None:
+        path = recorder["path"]
+        try:
+            frames = recording.stop_recording(recorder)
+            print(f"Recorded {frames} frames to {path} ({recorder['dropped']} dropped)")
+            show_notice("Recording Saved")
+        except RuntimeError as error:
+            print(error)
+            show_notice("Recording Failed")
+        recorder = None
+        return
+
+    # An mp4 through ffmpeg, or a GIF when only imageio is installed
+    extension = recording.default_extension()
+    if extension is None:
+        print("Recording needs ffmpeg on the PATH or the imageio package")
+        show_notice("Recording Needs ffmpeg")
+        return
+
+    if not os.path.exists(config.RECORDINGS_DIR):
+        os.makedirs(config.RECORDINGS_DIR)
+        print(f"Created recordings directory: {config.RECORDINGS_DIR}")
+
+    path = os.path.join(config.RECORDINGS_DIR, f'recording_{datetime.now().strftime("%Y%m%d_%H%M%S")}{extension}')
+    try:
+        # The window never waits on the encoder, frames it can't keep up with are dropped
+        # A memory budget also caps how many frames can wait for the encoder
+        queue_size = memory.queue_size(MEMORY_BUDGET, GRID_WIDTH * GRID_HEIGHT * board.itemsize, recording.QUEUE_SIZE)
+        recorder = recording.start_recording(
+            path, GRID_WIDTH, GRID_HEIGHT, COLORS, MAX_AGE, FPS, TILE_SIZE, drop=True, queue_size=queue_size
+        )
+    except (OSError, RuntimeError) as error:
+        print(error)
+        show_notice("Recording Failed")
+        return
+
+    show_notice("Recording...")
+
+def save_performance_trace():
+    if not profiler["trace"]:
+        display_message("Turn On HUD (P) First", duration=1)
+        return
+
+    base_dir = config.STATISTICS_DIR
+
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+        print(f"Created base directory: {base_dir}")
+
+    trace_filename = os.path.join(base_dir, f'trace_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    count = profiling.export_trace(profiler, trace_filename)
+    print(f"Saved {count} trace events to {trace_filename}")
+
+    display_message("Trace Saved", duration=1)
+
+def draw_performance(statistics):
+    summary = profiling.phase_summary(profiler)
+    memory = profiling.memory_usage_mb()
+    frame_budget = 1000 / FPS
+
+    lines = [
+        f"FPS: {clock.get_fps():.1f}",
+        f"Gens/sec: {profiling.generations_per_second(profiler):.1f}",
+        f"Live Cells: {statistics['Live Cells']}",
+        f"Memory: {memory:.1f} MB" if memory is not None else "Memory: n/a"
+    ]
+
+    # HUD Box
+    box_width = (WIDTH * 0.34)
+    box_height = (len(lines) + len(summary)) * 18 + 20
+    box_x = WIDTH - box_width - 15
+    box_y = 15
+    box_position = (box_x, box_y, box_width, box_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), box_position)
+
+    # HUD Border
+    border_thickness = 5
+    border_position = (
+        box_x - border_thickness,
+        box_y - border_thickness,
+        box_width + border_thickness,
+        box_height + border_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), border_position, border_thickness)
+
+    # HUD Text
+    font_size = 12
+    font = get_font(font_size)
+    x_offset = box_x + 10
+    y_offset = box_y + 10
+    for line in lines:
+        text = font.render(line, True, tuple(COLORS["BLACK"]))
+        screen.blit(text, (x_offset, y_offset))
+        y_offset += 18
+
+    # Phase Timings: mean/p95 ms, a bar for the mean against the frame budget, and the sample histogram
+    bar_x = box_x + box_width * 0.66
+    bar_width = box_width * 0.16
+    hist_x = bar_x + bar_width + 6
+    for name, (mean, p95, counts) in summary.items():
+        text = font.render(f"{name}: {mean:.2f}/{p95:.2f} ms", True, tuple(COLORS["BLACK"]))
+        screen.blit(text, (x_offset, y_offset))
+
+        fill = min(1, mean / frame_budget)
+        pygame.draw.rect(screen, tuple(COLORS["DARKGRAY"]), (bar_x, y_offset, bar_width, 10), 1)
+        pygame.draw.rect(screen, tuple(COLORS["RED"] if fill >= 1 else COLORS["REBECCAPURPLE"]), (bar_x, y_offset, bar_width * fill, 10))
+
+        tallest = max(counts)
+        for i, amount in enumerate(counts):
+            height = 10 * amount / tallest
+            pygame.draw.rect(screen, tuple(COLORS["BLACK"]), (hist_x + i * 4, y_offset + 10 - height, 3, height))
+        y_offset += 18
+
+def draw_statistics(statistics):
+
+    # Title Box
+    tbox_x = 60
+    tbox_y = 10
+    tbox_width = (WIDTH * 0.15)
+    tbox_height = (HEIGHT * 0.04)
+    tbox_position = (tbox_x, tbox_y, tbox_width, tbox_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), tbox_position)
+
+    # Title Border
+    tborder_thickness = 5
+    tborder_position = (
+        tbox_x - tborder_thickness,
+        tbox_y - tborder_thickness,
+        tbox_width + tborder_thickness,
+        tbox_height + tborder_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), tborder_position, tborder_thickness)
+
+    # Title Text
+    font_size = 25
+    font = get_font(font_size)
+    title = font.render("Statistics", True, tuple(COLORS["BLACK"]))
+    screen.blit(title, (tbox_x + 17, tbox_y + 10))
+
+    # Stats Box
+    box_x = 15
+    box_y = 65
+    box_width = (WIDTH * 0.25)
+    box_height = max(HEIGHT * 0.12, len(statistics) * 20 + 15)
+    box_position = (box_x, box_y, box_width, box_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), box_position)
+
+    # Stats Border
+    border_thickness = 10
+    border_position = (
+        box_x - border_thickness,
+        box_y - border_thickness,
+        box_width + border_thickness,
+        box_height + border_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), border_position, border_thickness)
+
+    # Stats Text
+    font_size = 14
+    font = get_font(font_size)
+    x_offset = box_x + 10
+    y_offset = box_y + 10
+    for name, value in statistics.items():
+        text = font.render(f"{name}: {value}", True, tuple(COLORS["BLACK"]))
+        screen.blit(text, (x_offset, y_offset))
+        y_offset += 20
+
+def draw_controls():
+    controls = {
+        "Toggle Controls:": "       T",
+        "Pause/Play:": "         Space",
+        "Generate:": "                G",
+        "Clear Board:": "            C",
+        "Toggle Grid:": "             H",
+        "Toggle Stats:": "            S",
+        "Toggle Intro:": "            E",
+        "Save Statistics:": "        X",
+        "Toggle HUD:": "             P",
+        "Export Trace:": "           O",
+        "Record Video:": "          R",
+        "Brush Size:": "              [ ]",
+        "Next Stamp:": "              K",
+        "Heatmap Overlay:": "     M",
+        "Max Age +/-:": "           Up/Down",
+        "Speed +/-:": "             Right/Left",
+        "Toggle Age Death:": "    A",
+        "Next Rules:": "              B",
+        "Reload Config:": "        L"
+    }
+
+    # Title Box
+    tbox_x = (WIDTH / 3 + 80)
+    tbox_y = (HEIGHT / 3 - 70)
+    tbox_width = (WIDTH * 0.166)
+    tbox_height = (HEIGHT * 0.05)
+    tbox_position = (tbox_x, tbox_y, tbox_width, tbox_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), tbox_position)
+
+    # Title Border
+    tborder_thickness = 5
+    tborder_position = (
+        tbox_x - tborder_thickness,
+        tbox_y - tborder_thickness,
+        tbox_width + tborder_thickness,
+        tbox_height + tborder_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), tborder_position, tborder_thickness)
+
+    # Title Text
+    font_size = 30
+    font = get_font(font_size)
+    title = font.render("Controls", True, tuple(COLORS["BLACK"]))
+    screen.blit(title, (tbox_x + 20, tbox_y + 10))
+
+    # Main Box
+    box_x = (WIDTH / 3)
+    box_y = (HEIGHT / 3)
+    box_width = (WIDTH * 0.33)
+    box_height = len(controls) * 30 + 20
+    box_position = (box_x, box_y, box_width, box_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), box_position)
+
+    # Main Border
+    border_thickness = 10
+    border_position = (
+        box_x - border_thickness,
+        box_y - border_thickness,
+        box_width + border_thickness,
+        box_height + border_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), border_position, border_thickness)
+    
+    # Main Text
+    font_size = 25
+    font = get_font(font_size)
+    x_offset = box_x + 10
+    y_offset = box_y + 10
+    for control, value in controls.items():
+        text = font.render(f"{control} {value}", True, tuple(COLORS["BLACK"]))
+        screen.blit(text, (x_offset, y_offset))
+        y_offset += 30
+
+def draw_introduction():
+    # Title Box
+    tbox_x = (WIDTH / 4)
+    tbox_y = (HEIGHT / 4)
+    tbox_width = (WIDTH * 0.5)
+    tbox_height = (HEIGHT * 0.2)
+    tbox_position = (tbox_x, tbox_y, tbox_width, tbox_height)
+    pygame.draw.rect(screen, tuple(COLORS["LAVENDER"]), tbox_position)
+
+    # Title Border
+    tborder_thickness = 10
+    tborder_position = (
+        tbox_x - tborder_thickness,
+        tbox_y - tborder_thickness,
+        tbox_width + tborder_thickness,
+        tbox_height + tborder_thickness
+    )
+    pygame.draw.rect(screen, tuple(COLORS["REBECCAPURPLE"]), tborder_position, tborder_thickness)
+
+    # Title Text
+    text = (
+        "           Welcome to:", 
+        "Conway's Conundrum!", 
+        "                     A twist on the famous", 
+        " Conway's Game of Life",
+        "E to Close, T for Controls"
+    )
+
+    x_offset = tbox_x + 65
+    y_offset = tbox_y + 35
+
+    for i, item in enumerate(text):
+        color = tuple(COLORS["VIOLET"]) if i == 1 else tuple(COLORS["BLACK"])   
+
+        if (i == 1):
+            font_size = 35
+        elif (i == 2):
+            font_size = 15
+        elif (i == 4):
+            font_size = 10
+            x_offset -= 55
+        else:
+            font_size = 30
+            y_offset -= 10
+
+        font = get_font(font_size)
+        print = font.render(f"{item}", True, color)
+        screen.blit(print, (x_offset, y_offset))
+        y_offset += 40
+
+    rules = pygame.image.load(config.RULES_IMAGE_FILE).convert_alpha()
+    screen.blit(rules, (tbox_x + 45, tbox_y + 210))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Conway's Conundrum")
+    config.add_parameter_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(params=None, argv=None):
+    global dirty
+
+    if params is None:
+        args = parse_args(argv)
+        try:
+            setup(config_files=args.config, overrides=config.overrides_from_args(args), replay=config.replay_from_args(args))
+        except (OSError, ValueError) as error:
+            raise SystemExit(f"error: {error}")
+    else:
+        setup(params)
+
+    running = True
+    playing = False
+    show_grid = True
+    show_stats = False
+    show_controls = False
+    show_intro = True
+    count = 0
+    positions = {}
+
+    generation = 0
+    previous_live_cell_count = 0
+    last_poll = time.time()
+    # Nothing has been drawn yet
+    stale = True
+    # Whether the last frame drew anything over the board, which has to be wiped even
+    # when it goes away by itself (an expired notice)
+    overlaid = False
+
+    while running:
+        # Paused, the loop sleeps until there is input (or the next poll or notice) instead of ticking at FPS
+        events = []
+        if playing:
+            clock.tick(FPS)
+        else:
+            wake = last_poll + 1 if notice is None else min(last_poll + 1, notice[1])
+            event = pygame.event.wait(max(1, int((wake - time.time()) * 1000)))
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        census_counts = None
+        dirty = []
+        # Whether anything on screen can have changed since the last frame
+        changed = stale or playing or notice is not None
+
+        # Pick up edits to the parameter files about once a second
+        if time.time() - last_poll > 1:
+            last_poll = time.time()
+            if config.files_changed(watcher):
+                reload_parameters()
+                changed = True
+            check_memory(positions)
+            changed = changed or profiler["enabled"]
+
+        if playing:
+            count += 1
+
+        if count >= UPDATE_FREQ:
+            count = 0
+            previous_live_cell_count = len(positions)
+            start = profiling.begin(profiler)
+            positions = adjust_grid(positions)
+            generation += 1
+            mark_dirty(None)
+            profiling.end(profiler, "adjust_grid", start)
+            profiling.mark_generation(profiler)
+
+            start = profiling.begin(profiler)
+            if track_cycles or recorder is not None or heatmap_tracker is not None or (CENSUS_FREQ and generation % CENSUS_FREQ == 0):
+                engine.positions_to_board(positions, board)
+
+            # Block density/age/activity maps every HEATMAP_FREQ generations
+            if heatmap_tracker is not None:
+                heatmaps.observe(heatmap_tracker, board, generation, MAX_AGE)
+
+            if recorder is not None:
+                recording.add_frame(recorder, board, generation)
+
+            # Flag extinction, still lifes and oscillators once the board starts repeating
+            if track_cycles:
+                if cycles.observe(cycle_tracker, board, generation, MAX_AGE) is not None and STOP_ON_CYCLE:
+                    playing = False
+
+            # Count blocks, blinkers, gliders... every CENSUS_FREQ generations
+            if CENSUS_FREQ and generation % CENSUS_FREQ == 0:
+                census_counts, _ = census.take_census(board)
+            profiling.end(profiler, "analysis", start)
+
+        start = profiling.begin(profiler)
+        events += pygame.event.get()
+        running, playing, show_grid, show_stats, show_controls, show_intro, positions, generation, count = handle_events(
+            running, playing, show_grid, show_stats, show_controls, show_intro, positions, generation, count, events
+        )
+        profiling.end(profiler, "handle_events", start)
+
+        # Moving the mouse without painting changes nothing
+        if not changed and all(event.type == pygame.MOUSEMOTION and not any(event.buttons) for event in events):
+            continue
+        stale = False
+
+        pygame.display.set_caption("Conway's Conundrum - Playing" if playing else "Conway's Conundrum - Paused")
+
+        start = profiling.begin(profiler)
+        screen.fill(BG_COLOR)
+        draw_grid(positions, show_grid)
+        draw_heatmap()
+        profiling.end(profiler, "draw_grid", start)
+
+        start = profiling.begin(profiler)
+        statistics = calculate_statistics(positions, generation, previous_live_cell_count, census_counts)
+        profiling.end(profiler, "calculate_statistics", start)
+
+        start = profiling.begin(profiler)
+        manage_panels(show_stats, show_controls, show_intro, statistics)
+        profiling.end(profiler, "manage_panels", start)
+
+        # Paused with nothing drawn over the board, only the edited cells can have changed
+        start = profiling.begin(profiler)
+        overlays = show_stats or show_controls or show_intro or heatmap_kind or profiler["enabled"] or notice is not None
+        if dirty is None or overlays or overlaid:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+        overlaid = bool(overlays)
+        profiling.end(profiler, "display_update", start)
+
+    if recorder is not None:
+        toggle_recording()
+
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
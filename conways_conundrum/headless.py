@@ -0,0 +1,294 @@
+import argparse
+import json
+import time
+import numpy as np
+from . import config
+from . import engine
+from . import cycles
+from . import census
+from . import heatmaps
+from . import ages
+from . import memory
+
+"""
+Headless runs of Conway's Conundrum: no window, just the array engine and statistics.
+
+    python -m conways_conundrum.headless --generations 10000
+
+Recording, the result cache and queries are only imported when a run uses
+them, so importing this module (ensembles, the server) stays cheap.
+
+"""
+
+STATISTICS_COLUMNS = ("Generation", "Live Cells", "Population Density", "Average Age", "Survival Rate")
+
+def generate_board(params, rng):
+    # Same soup as generate() in gui.py: 20-30% of the visible cells, duplicates allowed
+    grid_width, grid_height = config.grid_size(params)
+    total_cells = grid_width * grid_height
+    board = engine.empty_board(grid_width, grid_height, params["MAX_AGE"])
+    num = rng.integers(int(total_cells * 0.2), int(total_cells * 0.3))
+    board[rng.integers(0, grid_height, num), rng.integers(0, grid_width, num)] = 1
+    return board
+
+def board_statistics(histogram, max_age, total_cells, previous_live_cell_count):
+    # Array version of calculate_statistics in gui.py, read off the board's age histogram
+    num_live_cells, total_age = ages.summarize(histogram, max_age)
+    return (
+        num_live_cells,
+        num_live_cells / total_cells,
+        total_age / num_live_cells if num_live_cells > 0 else 0,
+        (num_live_cells / previous_live_cell_count) * 100 if previous_live_cell_count > 0 else 0
+    )
+
+def history_bytes(params, generations, track_heatmaps=False):
+    # Upper bound of what run() keeps per run: statistics columns, age histograms and heatmap samples if tracked
+    grid_width, grid_height = config.grid_size(params)
+    rows = generations + 1
+    # Age histograms are uint32 rows of MAX_AGE + 2 bins (see ages.new_tracker)
+    size = rows * (len(STATISTICS_COLUMNS) * 8 + (params["MAX_AGE"] + 2) * 4 + 8)
+    if track_heatmaps and params.get("HEATMAP_FREQ", 0):
+        bin_size = params.get("HEATMAP_BIN", 16)
+        blocks = -(-grid_width // bin_size) * -(-grid_height // bin_size)
+        size += (rows // params["HEATMAP_FREQ"] + 1) * (blocks * 8 + 8)
+    return size
+
+def run(params, generations, board=None, rng=None, stop_on_cycle=True, jump=True, recorder=None, track_heatmaps=False):
+    # track_heatmaps samples block heatmaps every HEATMAP_FREQ generations into result["Heatmaps"]
+    if recorder is not None:
+        from . import recording
+    if rng is None:
+        rng = np.random.default_rng()
+    if board is None:
+        board = generate_board(params, rng)
+
+    rules = engine.make_rules(params)
+    step = engine.stepper(params.get("ENGINE", "array"), rules)
+    grid_width, grid_height = config.grid_size(params)
+    total_cells = grid_width * grid_height
+    max_age = params["MAX_AGE"]
+
+    # Under a memory budget, history that would take more than half of it lives in memory-mapped files
+    spill = memory.spill_directory(params.get("MEMORY_BUDGET", 0), history_bytes(params, generations, track_heatmaps))
+
+    history = {name: memory.allocate(generations + 1, float, spill) for name in STATISTICS_COLUMNS}
+    history["Generation"] = np.arange(generations + 1)
+
+    # Random deaths never settle into a cycle, so there is nothing to detect
+    tracker = cycles.new_tracker(params.get("CYCLE_WINDOW", 64)) if stop_on_cycle and not rules["random_death"] else None
+    event = None
+
+    census_freq = params.get("CENSUS_FREQ", 0)
+    census_history = []
+
+    heatmap_freq = params.get("HEATMAP_FREQ", 0) if track_heatmaps else 0
+    heatmap_tracker = heatmaps.new_tracker(grid_width, grid_height, params.get("HEATMAP_BIN", 16), heatmap_freq, spill) if heatmap_freq else None
+
+    # Age histogram every stepped generation and lifetimes of every cell that dies before any jump ahead
+    age_tracker = ages.new_tracker(max_age, spill)
+
+    previous = 0
+    start = time.perf_counter()
+    generation = 0
+    while True:
+        histogram = ages.age_histogram(board)
+        ages.record(age_tracker, histogram, generation)
+        row = board_statistics(histogram, max_age, total_cells, previous)
+        for name, value in zip(STATISTICS_COLUMNS[1:], row):
+            history[name][generation] = value
+        previous = row[0]
+
+        if census_freq and generation % census_freq == 0:
+            census_history.append({"Generation": generation, **census.take_census(board)[0]})
+
+        if heatmap_tracker is not None:
+            heatmaps.observe(heatmap_tracker, board, generation, max_age)
+
+        # Only stepped generations are recorded, a jump ahead ends the video at the cycle
+        if recorder is not None:
+            recording.add_frame(recorder, board, generation)
+
+        if tracker is not None:
+            event = cycles.observe(tracker, board, generation, max_age)
+            if event is not None:
+                break
+
+        if generation == generations:
+            break
+
+        board = step(board, rng, age_tracker["deaths"])
+        generation += 1
+
+    stepped = generation
+    if event is not None and jump and generation < generations:
+        board = cycles.jump_ahead(board, event, generation, generations, lambda b: step(b, rng))
+        # The rest of the history repeats the last period
+        cycle = slice(generation - event["Period"] + 1, generation + 1)
+        for name in STATISTICS_COLUMNS[1:]:
+            history[name][generation + 1:] = np.resize(history[name][cycle], generations - generation)
+        generation = generations
+        if census_freq:
+            census_history.append({"Generation": generation, **census.take_census(board)[0]})
+    else:
+        history = {name: column[:generation + 1] for name, column in history.items()}
+
+    return {
+        "Generation": generation,
+        "Stepped Generations": stepped,
+        "Seconds": time.perf_counter() - start,
+        "Event": event,
+        "History": history,
+        "Census": census_history,
+        "Heatmaps": heatmap_tracker,
+        "Ages": age_tracker,
+        "Board": board
+    }
+
+def run_summary(result, max_age):
+    # The part of a run's result worth keeping in the cache. The board is clamped to MAX_AGE:
+    # after a jump ahead older cells have fallen behind their true age, and the clamped board
+    # is the same however the run got there
+    return {
+        "Generation": result["Generation"],
+        "Stepped Generations": result["Stepped Generations"],
+        "Seconds": result["Seconds"],
+        "Event": result["Event"],
+        "History": result["History"],
+        "Census": result["Census"],
+        "Lifetimes": ages.series(result["Ages"])["deaths"],
+        "Board": np.minimum(result["Board"], max_age)
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run Conway's Conundrum without a window")
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument("--soup", type=int, help="which soup of the seed to start from (board N of an ensemble), 0 unless replayed")
+    parser.add_argument("--keep-stepping", action="store_true", help="ignore cycle detection")
+    parser.add_argument("--no-jump", action="store_true", help="stop at a detected cycle instead of skipping to the last generation")
+    parser.add_argument("--census", type=int, help="take an object census every N generations (overrides CENSUS_FREQ)")
+    parser.add_argument("--output", help="write the statistics history to this json file")
+    parser.add_argument("--snapshot", metavar="FILE", help="write the final board (visible cells, ages clamped to MAX_AGE) and the run metadata to this .npz file")
+    parser.add_argument("--no-cache", action="store_true", help="always step, without reading or writing the result cache")
+    parser.add_argument("--query", action="append", default=[], metavar="QUERY", help='ask the statistics history, e.g. "max live-cells 5000:20000" (see analytics.py)')
+    parser.add_argument("--heatmaps", metavar="FILE", help="write the block heatmap series to this .npz file")
+    parser.add_argument("--record", metavar="FILE", help="record the run to a video/GIF (.mp4, .webm, .gif, .apng)")
+    parser.add_argument("--record-every", type=int, default=1, metavar="N", help="keep one generation in N")
+    parser.add_argument("--record-scale", type=int, default=1, metavar="N", help="pixels per cell")
+    parser.add_argument("--record-fps", type=int, default=30)
+    parser.add_argument("--record-drop", action="store_true", help="skip frames instead of slowing down when the encoder falls behind")
+    config.add_parameter_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    from . import cache
+    from . import analytics
+
+    args = parse_args()
+    try:
+        replay = config.replay_from_args(args)
+        params = config.layered_parameters(args.config, config.overrides_from_args(args), replay=replay)
+        engine.check_engine(params["ENGINE"], engine.make_rules(params))
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"error: {error}")
+    if replay is not None and replay.get("Edited"):
+        print("note: the replayed board was edited by hand, the soup is stepped without the edits")
+    if args.census is not None:
+        params["CENSUS_FREQ"] = args.census
+
+    # The seed and soup number are all it takes to step the same history again
+    seed = params["SEED"] if params["SEED"] is not None else config.new_seed()
+    soup = config.replay_soup(args, replay)
+    metadata = config.run_metadata(params, seed, soup)
+    grid_width, grid_height = config.grid_size(params)
+
+    # Recordings and heatmaps need the boards themselves, anything else can come from an earlier identical run
+    options = {
+        "Stop On Cycle": not args.keep_stepping,
+        "Jump": not args.no_jump,
+        "CENSUS_FREQ": params["CENSUS_FREQ"],
+        "CYCLE_WINDOW": params["CYCLE_WINDOW"]
+    }
+    key = cache.cache_key("headless", params, seed, soup, args.generations, options)
+    summary = None
+    if not (args.no_cache or args.record or args.heatmaps):
+        summary = cache.lookup(key)
+    cached = summary is not None
+
+    if not cached:
+        board = generate_board(params, config.soup_rng(seed, soup))
+
+        recorder = None
+        if args.record:
+            from . import recording
+            # No ffmpeg or imageio, or an unwritable path
+            try:
+                recorder = recording.start_recording(
+                    args.record, grid_width, grid_height, config.load_colors(), params["MAX_AGE"],
+                    args.record_fps, args.record_scale, args.record_every, args.record_drop, config.metadata_text(metadata),
+                    memory.queue_size(params["MEMORY_BUDGET"], board[:grid_height, :grid_width].nbytes, recording.QUEUE_SIZE)
+                )
+            except (OSError, RuntimeError) as error:
+                raise SystemExit(f"error: {error}")
+
+        result = run(
+            params, args.generations, board, config.step_rng(seed, soup),
+            stop_on_cycle=not args.keep_stepping, jump=not args.no_jump, recorder=recorder,
+            track_heatmaps=bool(args.heatmaps)
+        )
+
+        if recorder is not None:
+            frames = recording.stop_recording(recorder)
+            print(f"Recorded {frames} frames to {args.record} ({recorder['stalls']} stalls, {recorder['dropped']} dropped)")
+
+        if args.heatmaps and result["Heatmaps"] is not None:
+            samples = heatmaps.export(result["Heatmaps"], args.heatmaps, metadata)
+            print(f"Saved {samples} heatmap samples to {args.heatmaps}")
+
+        summary = run_summary(result, params["MAX_AGE"])
+        if not args.no_cache:
+            cache.store(key, summary, metadata, "headless", args.generations)
+
+    history = summary["History"]
+    print(config.metadata_text(metadata))
+    if cached:
+        print(f"Generation: {summary['Generation']} (cached, {summary['Stepped Generations']} stepped in {summary['Seconds']:.2f}s originally)")
+    else:
+        print(f"Generation: {summary['Generation']} ({summary['Stepped Generations']} stepped in {summary['Seconds']:.2f}s)")
+    if summary["Event"] is not None:
+        print(f"Cycle: {cycles.describe(summary['Event'])}")
+    print(f"Live Cells: {int(history['Live Cells'][-1])}")
+    print(f"Population Density: {history['Population Density'][-1]:.2%}")
+    print(f"Average Age: {history['Average Age'][-1]:.2f} Gens")
+    if summary["Census"]:
+        found = {name: count for name, count in summary["Census"][-1].items() if name != "Generation" and count}
+        print(f"Census: {', '.join(f'{name} {count}' for name, count in found.items())}")
+
+    lifetimes = summary["Lifetimes"]
+    if lifetimes.sum():
+        print(f"Average Lifetime: {(lifetimes @ np.arange(lifetimes.size)) / lifetimes.sum():.2f} Gens ({int(lifetimes.sum())} deaths)")
+
+    # Census counts can be queried too, they are NaN between census generations
+    if args.query:
+        columns = analytics.with_rows(history, summary["Census"])
+        for query in args.query:
+            try:
+                print(analytics.run_query(columns, query))
+            except (KeyError, ValueError) as error:
+                print(f"error: {error}")
+
+    if args.snapshot:
+        board = np.minimum(summary["Board"][:grid_height, :grid_width], params["MAX_AGE"])
+        np.savez_compressed(args.snapshot, board=board, metadata=json.dumps(metadata))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({
+                "Metadata": metadata,
+                "Event": summary["Event"],
+                "Census": summary["Census"],
+                "Lifetimes": lifetimes.tolist(),
+                "History": {name: column.tolist() for name, column in history.items()}
+            }, output_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import numpy as np
+from . import memory
+
+"""
+Spatial statistics for Conway's Conundrum.
+
+The visible grid is cut into bin x bin blocks and reduced to three maps per
+sample: live cells, summed (clamped) age and activity, the number of cells that
+were born or died since the last sample. Maps are kept as small integer arrays,
+so density and average age are derived when read instead of stored as floats.
+
+"""
+
+# Per-sample maps kept by a tracker, all (samples, bin rows, bin cols)
+MAPS = ("Live Cells", "Age", "Activity")
+
+def new_tracker(grid_width, grid_height, bin_size=16, every=1, spill=None):
+    rows = -(-grid_height // bin_size)
+    cols = -(-grid_width // bin_size)
+    return {
+        "bin": bin_size,
+        "every": every,
+        # Directory of the memory-mapped files samples grow into, None keeps them in memory
+        "spill": spill,
+        "grid_width": grid_width,
+        "grid_height": grid_height,
+        # The visible grid padded to whole bins and a MAX_AGE plane to clamp it with,
+        # both matching the board's age type (minimum against an array is much faster than against a scalar)
+        "padded": np.zeros((rows * bin_size, cols * bin_size), np.uint8),
+        "ceiling": None,
+        "previous": None,
+        "count": 0,
+        "generations": np.zeros(64, np.int64),
+        # Block counts are at most bin * bin, age sums at most bin * bin * MAX_AGE
+        "Live Cells": np.zeros((64, rows, cols), np.uint16),
+        "Age": np.zeros((64, rows, cols), np.uint32),
+        "Activity": np.zeros((64, rows, cols), np.uint16)
+    }
+
+def block_sum(plane, bin_size, dtype):
+    # Rows first: adding whole rows together is contiguous, so only the small
+    # (bin rows, cols) remainder pays for a short strided reduction
+    rows, cols = plane.shape
+    strips = plane.reshape(rows // bin_size, bin_size, cols).sum(axis=1, dtype=dtype)
+    return strips.reshape(rows // bin_size, cols // bin_size, bin_size).sum(axis=2, dtype=dtype)
+
+def observe(tracker, board, generation, max_age):
+    # Adds a sample every `every` generations, returns True if it did
+    if generation % tracker["every"]:
+        return False
+
+    visible = board[:tracker["grid_height"], :tracker["grid_width"]]
+    ceiling = tracker["ceiling"]
+    if ceiling is None or ceiling.dtype != board.dtype or ceiling[0, 0] != max_age:
+        tracker["ceiling"] = ceiling = np.full(visible.shape, max_age, board.dtype)
+        tracker["padded"] = np.zeros(tracker["padded"].shape, board.dtype)
+
+    padded = tracker["padded"]
+    np.minimum(visible, ceiling, out=padded[:tracker["grid_height"], :tracker["grid_width"]])
+    alive = padded > 0
+    previous = tracker["previous"] if tracker["previous"] is not None else alive
+    tracker["previous"] = alive
+
+    # Grow the store by doubling, like a list
+    index = tracker["count"]
+    if index == len(tracker["generations"]):
+        for name in ("generations", *MAPS):
+            tracker[name] = memory.grow(tracker[name], 2 * index, tracker["spill"])
+
+    tracker["generations"][index] = generation
+    tracker["Live Cells"][index] = block_sum(alive.view(np.uint8), tracker["bin"], np.uint16)
+    tracker["Age"][index] = block_sum(padded, tracker["bin"], np.uint32)
+    tracker["Activity"][index] = block_sum((alive != previous).view(np.uint8), tracker["bin"], np.uint16)
+    tracker["count"] = index + 1
+    return True
+
+def clear(tracker):
+    # Drops every sample, the next one has no earlier board to measure activity against
+    tracker["count"] = 0
+    tracker["previous"] = None
+
+def spill(tracker, directory=None):
+    tracker["spill"] = memory.spill(tracker, ("generations", *MAPS), directory)
+
+def block_cells(tracker):
+    # Visible cells in each block, edge blocks are partly padding
+    bin_size = tracker["bin"]
+    rows, cols = tracker["Live Cells"].shape[1:]
+    heights = np.minimum(bin_size, tracker["grid_height"] - np.arange(rows) * bin_size)
+    widths = np.minimum(bin_size, tracker["grid_width"] - np.arange(cols) * bin_size)
+    return np.outer(heights, widths)
+
+def heatmap(tracker, kind, index=-1):
+    # "Density", "Average Age" or "Activity" (changed cells per cell) for one sample as floats
+    if tracker["count"] == 0:
+        return None
+
+    index = index % tracker["count"]
+    live = tracker["Live Cells"][index].astype(float)
+    if kind == "Density":
+        return live / block_cells(tracker)
+    if kind == "Average Age":
+        return np.divide(tracker["Age"][index], live, out=np.zeros_like(live), where=live > 0)
+    if kind == "Activity":
+        return tracker["Activity"][index] / block_cells(tracker)
+    raise ValueError(f"Unknown heatmap {kind!r}")
+
+def series(tracker):
+    # Trimmed views of the stored samples
+    count = tracker["count"]
+    return {name: tracker[name][:count] for name in ("generations", *MAPS)}
+
+def export(tracker, path, metadata=None):
+    # Every sample as a compressed .npz, density and average age are recoverable from the counts.
+    # metadata (config.run_metadata) is stored as a json string
+    np.savez_compressed(
+        path,
+        metadata=json.dumps(metadata),
+        bin=tracker["bin"],
+        grid_width=tracker["grid_width"],
+        grid_height=tracker["grid_height"],
+        cells=block_cells(tracker),
+        **{name.lower().replace(" ", "_"): values for name, values in series(tracker).items()}
+    )
+    return tracker["count"]
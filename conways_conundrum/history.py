@@ -0,0 +1,45 @@
+import numpy as np
+from . import memory
+
+"""
+Per-generation statistics kept as columns.
+
+One float64 column per statistic, grown by doubling like a list, instead of one
+dict per generation (a fraction of the memory, and ready for numpy). Columns
+that only some generations have, like census counts, are NaN elsewhere. A
+history marked for spilling (see memory.spill) grows in memory-mapped files.
+
+"""
+
+def new_history(spill=None):
+    return {
+        "count": 0,
+        "columns": {},
+        "spill": spill
+    }
+
+def append(history, row):
+    index = history["count"]
+    columns = history["columns"]
+    capacity = len(next(iter(columns.values()))) if columns else 64
+    if index == capacity:
+        capacity *= 2
+        for name, column in columns.items():
+            columns[name] = memory.grow(column, capacity, history["spill"], np.nan)
+
+    for name, value in row.items():
+        if name not in columns:
+            columns[name] = memory.grow(np.zeros(0), capacity, history["spill"], np.nan)
+        columns[name][index] = value
+    history["count"] = index + 1
+
+def columns(history):
+    # Trimmed views, every column has one value per appended row
+    return {name: column[:history["count"]] for name, column in history["columns"].items()}
+
+def clear(history):
+    history["count"] = 0
+    history["columns"].clear()
+
+def spill(history, directory=None):
+    history["spill"] = memory.spill(history["columns"], list(history["columns"]), directory)
@@ -0,0 +1,168 @@
+import numpy as np
+from . import engine
+try:
+    import numba
+except ImportError:
+    numba = None
+
+"""
+Compiled stepping kernel for Conway's Conundrum (ENGINE "jit").
+
+step_board in engine.py builds a dozen whole-board temporaries per generation
+(padded planes, counts, masks, the incremented ages). Here neighbor counting,
+the B/S tables, AGE_DEATH and the saturating age increment happen in one pass
+over the board, compiled by numba. Every column keeps a rolling sum over the
+three rows around the current one: moving down a row adds the row coming in and
+subtracts the one going out. A cell's neighbor weight and whether it seeds
+births are looked up once, as one packed int, when its row comes in and kept in
+a three-row ring until it goes out, so each cell reads its count off three
+column sums and is written once. Rows are split between numba's threads
+(NUMBA_NUM_THREADS), and the compiled code is cached next to this file so only
+the first run compiles.
+
+A stepper() writes generations alternately into two boards it allocates once,
+so a long run allocates nothing per generation. Results match engine.step_board
+cell for cell (python -m conways_conundrum.oracle --engines jit). Without numba,
+and for AGE_DEATH_CHANCE (whose draws come from the numpy generator), it steps
+with engine.step_board instead.
+
+"""
+
+prange = numba.prange if numba is not None else range
+
+# Packed per-age table: the neighbor weight in the low bits, whether the cell seeds births from
+# ACTIVE_SHIFT up. Nine weights of at most 255 stay below it, so sums of packed values never carry
+ACTIVE_SHIFT = 16
+
+def fused_step(boards, out, packed, survive, born, max_age, age_death, check_active, limit, scratch, tallies, deaths, counting):
+    # boards and out are (boards, rows, cols). packed is per raw age (age_tables), survive and born
+    # are make_rules' tables. Each chunk of rows has its own scratch and death tallies, so threads
+    # never write to the same memory
+    count, rows, cols = boards.shape
+    chunks = tallies.shape[0]
+    lines = count * rows
+    for chunk in prange(chunks):
+        # Row 0 is the column sums, with a dead column on either side that is never written.
+        # Rows 1-3 are the ring: the packed values of board row r are in row 1 + r % 3
+        sums = scratch[chunk, 0]
+        ring = scratch[chunk, 1:]
+        first = chunk * lines // chunks
+        for line in range(first, (chunk + 1) * lines // chunks):
+            index = line // rows
+            row = line % rows
+
+            if line == first or row == 0:
+                # A new window: the row above (rows past the border are dead) and this one
+                for col in range(cols):
+                    sums[col + 1] = 0
+                for neighbor_row in range(max(row - 1, 0), row + 1):
+                    slot = ring[neighbor_row % 3]
+                    for col in range(cols):
+                        value = packed[boards[index, neighbor_row, col]]
+                        slot[col] = value
+                        sums[col + 1] += value
+            elif row >= 2:
+                # The row going out, into whose slot the row coming in goes
+                slot = ring[(row - 2) % 3]
+                for col in range(cols):
+                    sums[col + 1] -= slot[col]
+
+            if row + 1 < rows:
+                slot = ring[(row + 1) % 3]
+                for col in range(cols):
+                    value = packed[boards[index, row + 1, col]]
+                    slot[col] = value
+                    sums[col + 1] += value
+
+            center = ring[row % 3]
+            for col in range(cols):
+                age = boards[index, row, col]
+                total = sums[col] + sums[col + 1] + sums[col + 2] - center[col]
+                # Weighted counts wrap like the uint8 sums of count_neighbors
+                neighbors = total & 255
+                if survive[min(age, max_age), neighbors] and not (age_death and age >= max_age):
+                    out[index, row, col] = min(age, limit - 1) + 1
+                else:
+                    if counting and age > 0:
+                        tallies[chunk, age] += 1
+                    # Births need an active neighbor, as in step_board
+                    if born[neighbors] and (total >> ACTIVE_SHIFT > 0 or not check_active):
+                        out[index, row, col] = 1
+                    else:
+                        out[index, row, col] = 0
+
+    if counting:
+        for chunk in range(chunks):
+            for age in range(min(deaths.size, tallies.shape[1])):
+                deaths[age] += tallies[chunk, age]
+                tallies[chunk, age] = 0
+
+kernel = numba.njit(parallel=True, cache=True, nogil=True)(fused_step) if numba is not None else None
+
+# Passed for deaths when a step doesn't count them
+NO_DEATHS = np.zeros(0, np.int64)
+
+def available():
+    return kernel is not None
+
+def threads():
+    return numba.get_num_threads() if numba is not None else 1
+
+def new_buffers():
+    # Everything a run's steps write into or look up, made on first use: the two boards it
+    # alternates between, per-thread column sums, rings and death tallies, and the per-age table
+    return {"boards": [], "scratch": None, "tallies": None, "rules": None, "packed": None}
+
+def age_tables(rules, dtype):
+    # Neighbor weight and whether a cell still seeds births, packed, for every raw age the board
+    # can hold, so the kernel needs no clamping while it counts
+    ages = np.minimum(np.arange(np.iinfo(dtype).max + 1), rules["MAX_AGE"])
+    active = ages > 0
+    if rules["AGE_DEATH"]:
+        active &= ages < rules["MAX_AGE"]
+    return rules["weights"][ages].astype(np.int32) | (active.astype(np.int32) << ACTIVE_SHIFT)
+
+def prepared(board, rules, buffers):
+    # (out, scratch, tallies, packed) for a step, from the buffers when there are some
+    if buffers is None:
+        buffers = new_buffers()
+    boards = buffers["boards"]
+    if not boards or boards[0].shape != board.shape or boards[0].dtype != board.dtype:
+        boards[:] = [np.empty(board.shape, board.dtype), np.empty(board.shape, board.dtype)]
+        buffers["packed"] = None
+    # The buffer that doesn't hold `board`
+    out = boards[1] if board is boards[0] else boards[0]
+
+    scratch_shape = (threads(), 4, board.shape[-1] + 2)
+    if buffers["scratch"] is None or buffers["scratch"].shape != scratch_shape:
+        buffers["scratch"] = np.zeros(scratch_shape, np.int32)
+    tallies_shape = (threads(), np.iinfo(board.dtype).max + 1)
+    if buffers["tallies"] is None or buffers["tallies"].shape != tallies_shape:
+        buffers["tallies"] = np.zeros(tallies_shape, np.int64)
+    if buffers["packed"] is None or buffers["rules"] is not rules:
+        buffers["rules"] = rules
+        buffers["packed"] = age_tables(rules, board.dtype)
+    return out, buffers["scratch"], buffers["tallies"], buffers["packed"]
+
+def step_board(board, rules, rng=None, deaths=None, buffers=None):
+    # Same arguments and result as engine.step_board. With buffers the result is one of its two
+    # boards, so it gets overwritten two steps later
+    if kernel is None or rules["random_death"]:
+        return engine.step_board(board, rules, rng, deaths)
+
+    board = np.ascontiguousarray(board)
+    out, scratch, tallies, packed = prepared(board, rules, buffers)
+    check_active = bool(rules["AGE_DEATH"] or rules["born"][0] or not rules["plain_weights"])
+    kernel(
+        board.reshape(-1, *board.shape[-2:]), out.reshape(-1, *board.shape[-2:]),
+        packed, rules["survive"], rules["born"],
+        rules["MAX_AGE"], bool(rules["AGE_DEATH"]), check_active, int(np.iinfo(board.dtype).max),
+        scratch, tallies, NO_DEATHS if deaths is None else deaths, deaths is not None
+    )
+    return out
+
+def stepper(rules):
+    # step(board, rng=None, deaths=None) for one run, double buffered: keep a copy of any board
+    # that has to outlive the next step
+    buffers = new_buffers()
+    return lambda board, rng=None, deaths=None: step_board(board, rules, rng, deaths, buffers)
@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+from collections import deque
+import numpy as np
+from . import config
+
+"""
+Memory accounting and spilling for long runs.
+
+Structures are sized by walking them (large containers are sampled), grouped
+under a few names (engine state, history, caches, recordings) and compared with
+MEMORY_BUDGET (MB, 0 means no budget). Growing history stores allocate through
+allocate()/grow(), so once a store is marked with a spill directory its arrays
+live in memory-mapped temporary files: the pages stay usable like any array, but
+the OS writes them out instead of swapping. The files have no name on disk and
+go away with the arrays.
+
+"""
+
+MB = 1024 * 1024
+
+# Containers longer than this are sized from their first SAMPLE items
+SAMPLE = 256
+
+def allocate(shape, dtype, spill=None):
+    # Zeroed array, backed by an unnamed file in the spill directory when there is one
+    if spill is None or not np.prod(shape):
+        return np.zeros(shape, dtype)
+    os.makedirs(spill, exist_ok=True)
+    with tempfile.TemporaryFile(dir=spill) as backing:
+        return np.memmap(backing, dtype, "w+", shape=shape)
+
+def grow(array, rows, spill=None, fill=0):
+    # Copy with `rows` along the first axis, new rows set to fill
+    grown = allocate((rows, *array.shape[1:]), array.dtype, spill)
+    grown[:len(array)] = array
+    if fill:
+        grown[len(array):] = fill
+    return grown
+
+def spill(store, names, directory=None):
+    # Moves the named arrays of a dict into memory-mapped files and returns the directory,
+    # kept as the store's "spill" so later growth stays there
+    directory = directory or config.SPILL_DIR
+    for name in names:
+        array = store[name]
+        if isinstance(array, np.ndarray) and not isinstance(array, np.memmap):
+            store[name] = grow(array, len(array), directory)
+    return directory
+
+def sizeof(value):
+    # (resident bytes, spilled bytes) of a value and everything it holds
+    if isinstance(value, np.memmap):
+        return 0, value.nbytes
+    if isinstance(value, np.ndarray):
+        return value.nbytes, 0
+    if isinstance(value, dict):
+        items = list(value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        items = [(item, None) for item in value]
+    else:
+        return sys.getsizeof(value), 0
+
+    resident, spilled = sys.getsizeof(value), 0
+    sample = items[:SAMPLE]
+    for key, item in sample:
+        for part in (key, item):
+            if part is not None:
+                part_resident, part_spilled = sizeof(part)
+                resident += part_resident
+                spilled += part_spilled
+
+    # Only the first items were walked, assume the rest look alike
+    if len(items) > SAMPLE:
+        scale = len(items) / SAMPLE
+        return int(sys.getsizeof(value) + (resident - sys.getsizeof(value)) * scale), int(spilled * scale)
+    return resident, spilled
+
+def account(groups):
+    # {group: [structures]} -> {group: (resident bytes, spilled bytes)}
+    report = {}
+    for group, structures in groups.items():
+        sizes = [sizeof(structure) for structure in structures if structure is not None]
+        report[group] = (sum(size[0] for size in sizes), sum(size[1] for size in sizes))
+    return report
+
+def resident(report):
+    return sum(size[0] for size in report.values())
+
+def over_budget(report, budget):
+    # budget in MB, 0 never runs over
+    return bool(budget) and resident(report) > budget * MB
+
+def describe(report, budget):
+    # Lines for the statistics panel
+    lines = {"Memory": f"{resident(report) / MB:.1f} / {budget} MB" if budget else f"{resident(report) / MB:.1f} MB"}
+    for group, (in_memory, on_disk) in report.items():
+        lines[group] = f"{in_memory / MB:.1f} MB" + (f" (+{on_disk / MB:.1f} MB on disk)" if on_disk else "")
+    return lines
+
+def spill_directory(budget, projected):
+    # Where a run should keep its history, None while the projection fits in half the budget
+    if budget and projected > budget * MB / 2:
+        return config.SPILL_DIR
+    return None
+
+def queue_size(budget, frame_bytes, default):
+    # Recording frames that fit in a quarter of the budget, at least two so the writer never starves
+    if not budget:
+        return default
+    return max(2, min(default, int(budget * MB / 4 // max(frame_bytes, 1))))
@@ -0,0 +1,166 @@
+import argparse
+import json
+import sys
+import numpy as np
+from . import engine
+
+"""
+Differential testing for Conway's Conundrum engines.
+
+Random seeded boards and rules are stepped by the reference engine and by every
+other engine in engine.ENGINES, comparing state and age cell-for-cell after each
+generation. A mismatch is shrunk to the smallest board, cell set and generation
+count that still shows it, then written out as a json repro.
+
+    python -m conways_conundrum.oracle --cases 500 --generations 40
+
+The reference is the dict engine (the original adjust_grid loop) for classic
+rules, and the array engine for the age-aware variants the dict engine can't run.
+
+"""
+
+def random_case(rng, variants):
+    max_age = int(rng.integers(1, 13))
+    params = {
+        "MAX_AGE": max_age,
+        "SURVIVAL_CELL_AMOUNT": sorted(rng.choice(9, int(rng.integers(0, 5)), replace=False).tolist()),
+        "REPRODUCTION_CELL_AMOUNT": sorted(rng.choice(np.arange(1, 9), int(rng.integers(1, 4)), replace=False).tolist()),
+        "AGE_DEATH": bool(rng.integers(0, 2))
+    }
+    if variants:
+        params["AGE_SURVIVAL_CELL_AMOUNT"] = {str(int(rng.integers(1, max_age + 1))): sorted(rng.choice(9, 2, replace=False).tolist())}
+        params["AGE_DEATH_CHANCE"] = float(rng.choice([0, 0.1, 0.5]))
+        params["OLD_NEIGHBOR_WEIGHT"] = int(rng.integers(0, 3))
+
+    height, width = rng.integers(4, 48, 2)
+    board = np.zeros((height, width), engine.age_dtype(max_age))
+    alive = rng.random(board.shape) < rng.uniform(0.1, 0.6)
+    # Start with mixed ages so AGE_DEATH and the age tables are hit from the first generation
+    board[alive] = rng.integers(1, max_age + 3, int(alive.sum()))
+    return params, board
+
+def reference_for(rules):
+    return "dict" if rules["classic"] else "array"
+
+def first_mismatch(params, board, name, generations, seed):
+    # Generation of the first difference between the reference and engine `name`, or None
+    rules = engine.make_rules(params)
+    reference_step = engine.ENGINES[reference_for(rules)]
+    step = engine.ENGINES[name]
+    # Same seed on both sides, so random age deaths draw identical numbers
+    reference_rng = np.random.default_rng(seed)
+    rng = np.random.default_rng(seed)
+
+    expected = board
+    actual = board.copy()
+    for generation in range(1, generations + 1):
+        expected = reference_step(expected, rules, reference_rng)
+        actual = step(actual, rules, rng)
+        if not np.array_equal(expected, actual):
+            return generation
+    return None
+
+def trim_edges(params, board, name, generations, seed):
+    # Cut empty rows/columns from each side in turn, keeping a cut only if the bug survives it,
+    # since bugs at the right/bottom margin need that edge to stay where it is
+    rows, cols = np.nonzero(board)
+    if rows.size == 0:
+        return board
+
+    margin = generations + 1
+    cuts = (
+        (slice(max(0, rows.min() - margin), None), slice(None)),
+        (slice(None, rows.max() + margin + 1), slice(None)),
+        (slice(None), slice(max(0, cols.min() - margin), None)),
+        (slice(None), slice(None, cols.max() + margin + 1))
+    )
+    for cut in cuts:
+        trial = board[cut]
+        if trial.shape != board.shape and first_mismatch(params, trial, name, generations, seed) is not None:
+            board = trial.copy()
+    return board
+
+def shrink(params, board, name, generations, seed):
+    # Greedy delta debugging: fewer generations, fewer live cells, then a smaller board
+    generations = first_mismatch(params, board, name, generations, seed)
+
+    cells = list(zip(*np.nonzero(board)))
+    chunk = max(1, len(cells) // 2)
+    while cells:
+        removed_any = False
+        for start in range(0, len(cells), chunk):
+            trial = board.copy()
+            for row, col in cells[start:start + chunk]:
+                trial[row, col] = 0
+            found = first_mismatch(params, trial, name, generations, seed)
+            if found is not None:
+                board, generations = trial, found
+                removed_any = True
+        cells = list(zip(*np.nonzero(board)))
+        if not removed_any:
+            if chunk == 1:
+                break
+            chunk //= 2
+
+    return trim_edges(params, board, name, generations, seed), generations
+
+def board_text(board):
+    # One line per row: "." dead, otherwise the age (capped at 9 for readability)
+    return ["".join("." if age == 0 else str(min(age, 9)) for age in row) for row in board.tolist()]
+
+def run_cases(cases, generations, seed, names, variants):
+    failures = []
+    for case in range(cases):
+        rng = np.random.default_rng([seed, case])
+        params, board = random_case(rng, variants)
+        rules = engine.make_rules(params)
+        for name in names:
+            if name == reference_for(rules) or (name == "dict" and not rules["classic"]):
+                continue
+            case_seed = seed * 1000003 + case
+            if first_mismatch(params, board, name, generations, case_seed) is None:
+                continue
+
+            small, at = shrink(params, board, name, generations, case_seed)
+            failures.append({
+                "engine": name,
+                "reference": reference_for(rules),
+                "case": case,
+                "seed": case_seed,
+                "params": params,
+                "generation": at,
+                "board": board_text(small),
+                "ages": small.tolist()
+            })
+    return failures
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check every engine against the reference engine")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--generations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", default=list(engine.ENGINES), choices=list(engine.ENGINES))
+    parser.add_argument("--output", default="oracle_failures.json", help="where to write shrunk repros")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    failures = []
+    # Classic rules against the dict engine, then the age-aware variants against the array engine
+    for variants in (False, True):
+        failures += run_cases(args.cases, args.generations, args.seed, args.engines, variants)
+
+    if not failures:
+        print(f"All engines match over {args.cases * 2} cases x {args.generations} generations")
+        return 0
+
+    for failure in failures:
+        print(f"{failure['engine']} differs from {failure['reference']} at generation {failure['generation']} (case {failure['case']}):")
+        print("\n".join("    " + line for line in failure["board"]))
+    with open(args.output, "w") as output_file:
+        json.dump(failures, output_file, indent=2)
+    print(f"{len(failures)} mismatches written to {args.output}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import numpy as np
+from .census import KNOWN_OBJECTS
+
+"""
+Statistics plots for Conway's Conundrum.
+
+matplotlib takes a few hundred milliseconds to import, so it is only loaded
+the first time something is actually saved.
+
+"""
+
+def save_plots(statistics_columns, stats_dir, parameters_text, age_series=None):
+    # statistics_columns is history.columns(), one array per statistic
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    generations = statistics_columns["Generation"]
+    live_cells = statistics_columns["Live Cells"]
+    population_density = statistics_columns["Population Density"]
+    average_age = statistics_columns["Average Age"]
+
+    # Plot 1: Generation - Live Cells
+    plt.figure(figsize=(10, 5))
+    plt.plot(generations, live_cells, label="Live Cells Over Time", color="red", linewidth=2)
+    plt.title("Conway's Conundrum - Live Cells Over Time")
+    plt.xlabel("Generation")
+    plt.ylabel("Live Cells")
+    plt.legend()
+    plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+    live_cells_filename = os.path.join(stats_dir, 'live_cells_over_time.png')
+    plt.savefig(live_cells_filename)
+    plt.close()
+
+    # Plot 2: Generation - Population Density
+    plt.figure(figsize=(10, 5))
+    plt.plot(generations, population_density, label="Population Density Over Time", color="green", linewidth=2)
+    plt.title("Conway's Conundrum - Population Density Over Time")
+    plt.xlabel("Generation")
+    plt.ylabel("Population Density (%)")
+    plt.yticks([i / 100.0 for i in range(0, 101, 10)], [f'{i}%' for i in range(0, 101, 10)])
+    plt.legend()
+    plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+    population_density_filename = os.path.join(stats_dir, 'population_density_over_time.png')
+    plt.savefig(population_density_filename)
+    plt.close()
+
+    # Plot 3: Generation - Average Age
+    plt.figure(figsize=(10, 5))
+    plt.plot(generations, average_age, label="Average Age Over Time", color="blue", linewidth=2)
+    plt.title("Conway's Conundrum - Average Cell Age Over Time")
+    plt.xlabel("Generation")
+    plt.ylabel("Average Age (Gens)")
+    plt.legend()
+    plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+    average_age_filename = os.path.join(stats_dir, 'average_age_over_time.png')
+    plt.savefig(average_age_filename)
+    plt.close()
+
+    # Plot 4: Generation - Object Census
+    # Census columns are NaN on generations without a census
+    census_rows = ~np.isnan(statistics_columns["Other"]) if "Other" in statistics_columns else None
+    if census_rows is not None and census_rows.any():
+        plt.figure(figsize=(10, 5))
+        census_generations = generations[census_rows]
+        for name in [*KNOWN_OBJECTS, "Other"]:
+            counts = statistics_columns[name][census_rows]
+            if counts.any():
+                plt.plot(census_generations, counts, label=name, linewidth=2)
+        plt.title("Conway's Conundrum - Object Census Over Time")
+        plt.xlabel("Generation")
+        plt.ylabel("Objects")
+        plt.legend(fontsize=8)
+        plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+        census_filename = os.path.join(stats_dir, 'object_census_over_time.png')
+        plt.savefig(census_filename)
+        plt.close()
+
+    if age_series is None or not len(age_series["generations"]):
+        return
+
+    # Plot 5: Generation - Age Distribution (share of live cells at each age, the top row is every cell past MAX_AGE)
+    histograms = age_series["histograms"][:, 1:].astype(float)
+    live = histograms.sum(axis=1, keepdims=True)
+    shares = np.divide(histograms, live, out=np.zeros_like(histograms), where=live > 0)
+    generations = age_series["generations"]
+    plt.figure(figsize=(10, 5))
+    # Log colors, most cells are only a few generations old
+    plt.imshow(
+        np.ma.masked_equal(shares.T, 0), aspect="auto", origin="lower", cmap="magma", interpolation="nearest",
+        norm=LogNorm(vmin=max(shares[shares > 0].min(initial=1), 1e-5), vmax=1),
+        extent=(generations[0], generations[-1] + 1, 0.5, shares.shape[1] + 0.5)
+    )
+    plt.colorbar(label="Share of Live Cells")
+    plt.title("Conway's Conundrum - Age Distribution Over Time")
+    plt.xlabel("Generation")
+    plt.ylabel("Age (Gens)")
+    plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+    age_distribution_filename = os.path.join(stats_dir, 'age_distribution_over_time.png')
+    plt.savefig(age_distribution_filename)
+    plt.close()
+
+    # Plot 6: Lifetime at Death
+    deaths = age_series["deaths"]
+    if deaths.sum():
+        plt.figure(figsize=(10, 5))
+        plt.bar(np.arange(1, deaths.size), deaths[1:], color="purple", width=1)
+        plt.yscale("log")
+        plt.title("Conway's Conundrum - Lifetime at Death")
+        plt.xlabel("Age at Death (Gens)")
+        plt.ylabel("Cells")
+        plt.figtext(0.5, 0.01, parameters_text, horizontalalignment='center', fontsize=8, wrap=True)
+        lifetimes_filename = os.path.join(stats_dir, 'lifetime_at_death.png')
+        plt.savefig(lifetimes_filename)
+        plt.close()
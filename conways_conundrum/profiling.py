@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from collections import deque
+
+"""
+Phase timing for the main loop of Conway's Conundrum.
+
+    start = profiling.begin(profiler)
+    positions = adjust_grid(positions)
+    profiling.end(profiler, "adjust_grid", start)
+
+While the profiler is off, begin() returns None and end() returns straight away,
+so the only cost left in the loop is two function calls per phase.
+
+"""
+
+def new_profiler(window=240, trace_limit=200000):
+    return {
+        "enabled": False,
+        "window": window,
+        # Rolling durations (seconds) per phase, last `window` samples
+        "phases": {},
+        # Timestamps of recent generations, for gens/sec
+        "generations": deque(maxlen=window),
+        # Complete events for the Chrome trace, oldest dropped first
+        "trace": deque(maxlen=trace_limit),
+        "origin": time.perf_counter()
+    }
+
+def toggle(profiler):
+    profiler["enabled"] = not profiler["enabled"]
+    if profiler["enabled"]:
+        profiler["phases"].clear()
+        profiler["generations"].clear()
+    return profiler["enabled"]
+
+def begin(profiler):
+    if not profiler["enabled"]:
+        return None
+    return time.perf_counter()
+
+def end(profiler, name, start):
+    if start is None:
+        return
+    now = time.perf_counter()
+    samples = profiler["phases"].get(name)
+    if samples is None:
+        samples = profiler["phases"][name] = deque(maxlen=profiler["window"])
+    samples.append(now - start)
+    profiler["trace"].append((name, start, now - start))
+
+def mark_generation(profiler):
+    if profiler["enabled"]:
+        profiler["generations"].append(time.perf_counter())
+
+def generations_per_second(profiler):
+    stamps = profiler["generations"]
+    if len(stamps) < 2 or stamps[-1] == stamps[0]:
+        return 0
+    return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+def phase_summary(profiler):
+    # {phase: (mean ms, p95 ms, histogram)} with the histogram as sample counts per bucket
+    summary = {}
+    for name, samples in profiler["phases"].items():
+        ordered = sorted(samples)
+        mean = sum(ordered) / len(ordered) * 1000
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+        summary[name] = (mean, p95, histogram(ordered))
+    return summary
+
+def histogram(ordered, buckets=8):
+    # Linear buckets from 0 to the slowest sample
+    top = ordered[-1] or 1
+    counts = [0] * buckets
+    for sample in ordered:
+        counts[min(buckets - 1, int(sample / top * buckets))] += 1
+    return counts
+
+def memory_usage_mb():
+    # Current resident memory where it can be read cheaply
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak, not current, but the best the platform offers without extra packages
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+def export_trace(profiler, filename):
+    # Chrome trace format, open in chrome://tracing or https://ui.perfetto.dev
+    origin = profiler["origin"]
+    events = [
+        {"name": name, "ph": "X", "ts": (start - origin) * 1e6, "dur": duration * 1e6, "pid": 1, "tid": 1}
+        for name, start, duration in profiler["trace"]
+    ]
+    with open(filename, "w") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+    return len(events)
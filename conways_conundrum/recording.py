@@ -0,0 +1,200 @@
+import importlib.util
+import shutil
+import subprocess
+import threading
+import queue
+import numpy as np
+from . import engine
+
+"""
+Video/GIF recording for Conway's Conundrum.
+
+Frames come straight from the age plane, so no window is needed. The stepping
+loop only copies the visible board into a bounded queue; a writer thread hands
+it to the encoder. With a local ffmpeg process the frames go over as 8-bit
+palette indices plus the palette (ffmpeg's pal8), and ffmpeg does the colors and
+the scaling, so the Python side only moves one byte per cell. Without ffmpeg,
+imageio (if installed) gets RGB frames rendered here. The container comes from
+the file extension (.mp4, .webm, .gif, .apng, ...).
+
+"""
+
+# Frames waiting for the writer thread, the stepping loop blocks once this fills up
+QUEUE_SIZE = 64
+
+def palette(colors, max_age):
+    # Same gradient as get_color in gui.py, row 0 is the background
+    young_color = np.array(colors["BLACK"], float)
+    old_color = np.array(colors["FUCHSIA"], float)
+    ratio = np.arange(max_age + 1)[:, None] / max_age
+    table = np.zeros((max_age + 1, 4), np.uint8)
+    table[:, :3] = young_color * (1 - ratio) + old_color * ratio
+    table[0, :3] = colors["BLACK"]
+    # One uint32 per age, a flat lookup is several times faster than gathering RGB rows
+    return table.view(np.uint32).ravel()
+
+def frame_palette(colors, max_age):
+    # (steps, table) for recording: table is the 256-entry palette, steps maps every raw age of a
+    # plane wider than uint8 onto 254 even steps of the gradient (as many colors as it can have),
+    # None for uint8 planes, whose ages clamped to MAX_AGE are the index. The last entries stay
+    # unused either way, GIFs need a free one for transparency between frames
+    gradient = palette(colors, max_age)
+    table = np.zeros(256, np.uint32)
+    if engine.age_dtype(max_age) == np.uint8:
+        table[:max_age + 1] = gradient
+        return None, table
+    ages = np.minimum(np.arange(np.iinfo(engine.age_dtype(max_age)).max + 1), max_age)
+    steps = np.where(ages > 0, 1 + (ages - 1) * 253 // (max_age - 1), 0).astype(np.uint8)
+    table[steps] = gradient[ages]
+    return steps, table
+
+def pal8_palette(table):
+    # ffmpeg's pal8 palette: 256 opaque 0xAARRGGBB words, native (little) endian
+    rgb = table.view(np.uint8).reshape(-1, 4).astype(np.uint32)
+    return (0xFF000000 | rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2]).astype("<u4").tobytes()
+
+def render_frame(board, table, scale=1):
+    # (rows, cols) age plane -> (rows * scale, cols * scale, 4) RGBX, the padding byte keeps rows contiguous
+    frame = np.take(table, np.minimum(board, len(table) - 1)).view(np.uint8).reshape(*board.shape, 4)
+    if scale > 1:
+        frame = frame.repeat(scale, axis=0).repeat(scale, axis=1)
+    return frame
+
+def ffmpeg_command(path, width, height, fps, scale=1, comment=None):
+    command = [
+        shutil.which("ffmpeg"), "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "pal8", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-"
+    ]
+    # Only GIF and APNG take palette frames as they are. Everything else, and scaling (which can't
+    # produce them), gets them expanded to RGB first, so ffmpeg converts colors the way it does
+    # for RGB input instead of straight from the palette or with nearest-neighbor chroma
+    filters = []
+    if scale > 1 or not path.endswith((".gif", ".apng")):
+        filters.append("format=rgb24")
+    if scale > 1:
+        filters += [f"scale=iw*{scale}:ih*{scale}:flags=neighbor", "format=rgb24"]
+    if path.endswith((".mp4", ".mov", ".mkv")):
+        # H.264 wants even dimensions and 4:2:0 chroma
+        filters.append("pad=ceil(iw/2)*2:ceil(ih/2)*2")
+        command += ["-pix_fmt", "yuv420p", "-preset", "veryfast"]
+    elif path.endswith(".webm"):
+        command += ["-deadline", "realtime", "-cpu-used", "8"]
+    elif path.endswith(".apng"):
+        command += ["-f", "apng", "-plays", "0"]
+    if filters:
+        command += ["-vf", ",".join(filters)]
+    if comment:
+        command += ["-metadata", f"comment={comment}"]
+    return command + [path]
+
+def default_extension():
+    # What the window records to: .mp4 through ffmpeg, a GIF through imageio without it,
+    # None when there is neither
+    if shutil.which("ffmpeg"):
+        return ".mp4"
+    if importlib.util.find_spec("imageio") is not None:
+        return ".gif"
+    return None
+
+def open_encoder(path, width, height, fps, table, scale=1, comment=None):
+    # Returns write(indices), close(). indices are a (height, width) uint8 frame of table entries.
+    # The comment (run metadata) is only kept by ffmpeg
+    if shutil.which("ffmpeg"):
+        process = subprocess.Popen(ffmpeg_command(path, width, height, fps, scale, comment), stdin=subprocess.PIPE)
+        colors = pal8_palette(table)
+
+        def write(indices):
+            # Every pal8 frame carries its palette after the pixels
+            process.stdin.write(indices.data)
+            process.stdin.write(colors)
+
+        def close():
+            process.stdin.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with code {process.returncode} writing {path}")
+
+        return write, close
+
+    try:
+        import imageio.v2 as imageio
+    except ImportError:
+        raise RuntimeError("Recording needs ffmpeg on the PATH or the imageio package")
+
+    writer = imageio.get_writer(path, fps=fps)
+    return lambda indices: writer.append_data(render_frame(indices, table, scale)[..., :3]), writer.close
+
+def start_recording(path, grid_width, grid_height, colors, max_age, fps=30, scale=1, every=1, drop=False, comment=None, queue_size=QUEUE_SIZE):
+    steps, table = frame_palette(colors, max_age)
+    write, close = open_encoder(path, grid_width, grid_height, fps, table, scale, comment)
+    recorder = {
+        "path": path,
+        "grid_width": grid_width,
+        "grid_height": grid_height,
+        # Raw age -> palette index for planes wider than uint8, otherwise the visible grid is
+        # clamped against a MAX_AGE plane (much faster than against a scalar)
+        "steps": steps,
+        "ceiling": np.full((grid_height, grid_width), max_age, np.uint8) if steps is None else None,
+        # Keep one generation in every `every`
+        "every": every,
+        # Skip frames instead of waiting when the encoder falls behind
+        "drop": drop,
+        "frames": queue.Queue(queue_size),
+        "written": 0,
+        # Frames that found the queue full, waited for or skipped when dropping
+        "stalls": 0,
+        "dropped": 0,
+        "error": None
+    }
+    recorder["thread"] = threading.Thread(target=write_frames, args=(recorder, write, close), daemon=True)
+    recorder["thread"].start()
+    return recorder
+
+def write_frames(recorder, write, close):
+    try:
+        while True:
+            board = recorder["frames"].get()
+            if board is None:
+                break
+            write(board)
+            recorder["written"] += 1
+    except Exception as error:
+        recorder["error"] = error
+        # Keep draining so the stepping loop never blocks on a dead encoder
+        while recorder["frames"].get() is not None:
+            pass
+    finally:
+        try:
+            close()
+        except Exception as error:
+            recorder["error"] = recorder["error"] or error
+
+def add_frame(recorder, board, generation):
+    if generation % recorder["every"]:
+        return
+
+    # Only the visible grid as palette indices, copied so stepping can reuse the board
+    visible = board[:recorder["grid_height"], :recorder["grid_width"]]
+    if recorder["steps"] is None:
+        frame = np.minimum(visible, recorder["ceiling"])
+    else:
+        frame = np.take(recorder["steps"], visible)
+    try:
+        recorder["frames"].put_nowait(frame)
+    except queue.Full:
+        if recorder["drop"]:
+            recorder["dropped"] += 1
+        else:
+            recorder["stalls"] += 1
+            recorder["frames"].put(frame)
+
+def buffered_bytes(recorder):
+    # Frames waiting for the writer thread
+    return recorder["frames"].qsize() * recorder["grid_width"] * recorder["grid_height"]
+
+def stop_recording(recorder):
+    # Flushes the queue and closes the file, returns the number of frames written
+    recorder["frames"].put(None)
+    recorder["thread"].join()
+    if recorder["error"] is not None:
+        raise RuntimeError(f"Recording {recorder['path']} failed: {recorder['error']}")
+    return recorder["written"]
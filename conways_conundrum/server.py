@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import base64
+import json
+import time
+import urllib.parse
+import zlib
+import numpy as np
+from . import config
+from . import engine
+from . import headless
+from . import recording
+from . import ages
+
+"""
+A local streaming server for watching and steering a board from a browser.
+
+One asyncio loop runs both the board and the clients. The board steps in short
+slices and only ever publishes its latest state; each client is its own task
+that wakes at the frame rate it asked for, takes whatever generation is current,
+and waits on its own socket. A slow viewer just sees fewer generations, it never
+holds the board back. Frames are the visible board shrunk to the client's size
+(oldest cell of every block), zlib-compressed, and are encoded once per
+generation and size however many clients share them.
+
+Only the standard library is used: server-sent events carry frames and
+statistics, and commands are json POSTs.
+
+    python -m conways_conundrum.server --port 8765 --seed 42
+
+    GET  /                  viewer page
+    GET  /stream?fps=15&size=256
+    GET  /state
+    POST /command           {"command": "pause" | "play" | "step" | "seed" | "rule" | "speed", ...}
+
+"""
+
+# Longest the board steps before letting the clients run
+STEP_SLICE = 0.02
+
+MAX_CLIENT_FPS = 60
+
+# Most single steps that can be queued at once
+MAX_STEPS = 10000
+
+def new_simulation(params, seed, soup=0):
+    grid_width, grid_height = config.grid_size(params)
+    sim = {
+        "params": params,
+        "grid_width": grid_width,
+        "grid_height": grid_height,
+        "playing": True,
+        # Single steps queued while paused
+        "steps": 0,
+        # Generations per second, 0 steps as fast as the machine allows
+        "speed": 0,
+        # Bumped on every change to the board, clients compare it to what they sent last
+        "version": 0,
+        "palette_version": 0,
+        "rate": 0.0,
+        "frames": {},
+        # Set whenever there is something for the stepping task to do
+        "wake": asyncio.Event()
+    }
+    set_rules(sim, params)
+    new_soup(sim, seed, soup)
+    return sim
+
+def new_soup(sim, seed, soup):
+    # Generators first, they reject negative seeds and soups before anything changes
+    rng = config.step_rng(seed, soup)
+    board = headless.generate_board(sim["params"], config.soup_rng(seed, soup))
+    sim["seed"] = seed
+    sim["soup"] = soup
+    sim["rng"] = rng
+    sim["board"] = board
+    sim["generation"] = 0
+    # Steps queued for the old board don't carry over to the new one
+    sim["steps"] = 0
+    changed(sim)
+
+def set_rules(sim, params):
+    # Rules first, so parameters make_rules or the engine reject leave the simulation as it was
+    rules = engine.make_rules(params)
+    step = engine.stepper(params.get("ENGINE", "array"), rules)
+    sim["params"] = params
+    sim["rules"] = rules
+    sim["step"] = step
+    sim["palette"] = recording.palette(config.load_colors(), params["MAX_AGE"]).view(np.uint8).reshape(-1, 4)[:, :3].tolist()
+    sim["palette_version"] += 1
+    sim["ceiling"] = np.full((sim["grid_height"], sim["grid_width"]), params["MAX_AGE"], sim["rules"]["dtype"])
+    # A larger MAX_AGE can need a wider age type
+    if "board" in sim and sim["board"].dtype != sim["rules"]["dtype"]:
+        sim["board"] = sim["board"].astype(sim["rules"]["dtype"])
+    changed(sim)
+
+def changed(sim):
+    sim["version"] += 1
+    sim["frames"].clear()
+    sim["wake"].set()
+
+def step(sim):
+    sim["board"] = sim["step"](sim["board"], sim["rng"])
+    sim["generation"] += 1
+    changed(sim)
+
+async def simulate(sim):
+    # Steps in slices of at most STEP_SLICE seconds, or one generation per tick when the speed is limited
+    stepped = 0
+    since = time.perf_counter()
+    while True:
+        if not sim["playing"] and not sim["steps"]:
+            sim["wake"].clear()
+            await sim["wake"].wait()
+            continue
+
+        start = time.perf_counter()
+        while sim["playing"] or sim["steps"]:
+            if not sim["playing"]:
+                sim["steps"] -= 1
+            step(sim)
+            stepped += 1
+            if sim["speed"] or time.perf_counter() - start > STEP_SLICE:
+                break
+
+        now = time.perf_counter()
+        if now - since > 1:
+            sim["rate"] = stepped / (now - since)
+            stepped = 0
+            since = now
+        await asyncio.sleep(1 / sim["speed"] if sim["speed"] and sim["playing"] else 0)
+
+def shrink(plane, factor):
+    # Oldest cell of every factor x factor block, rows first so the long reduction stays contiguous
+    if factor == 1:
+        return plane
+    rows, cols = plane.shape
+    padded = np.zeros((-(-rows // factor) * factor, -(-cols // factor) * factor), plane.dtype)
+    padded[:rows, :cols] = plane
+    strips = padded.reshape(-1, factor, padded.shape[1]).max(axis=1)
+    return strips.reshape(strips.shape[0], -1, factor).max(axis=2)
+
+def frame_event(sim, size):
+    # The current generation for one client size, shared until the board changes
+    factor = max(1, -(-max(sim["grid_width"], sim["grid_height"]) // size))
+    if factor in sim["frames"]:
+        return sim["frames"][factor]
+
+    board = sim["board"]
+    visible = np.minimum(board[:sim["grid_height"], :sim["grid_width"]], sim["ceiling"])
+    small = shrink(visible, factor)
+    live, density, average_age, _ = headless.board_statistics(
+        ages.age_histogram(board), sim["params"]["MAX_AGE"], sim["grid_width"] * sim["grid_height"], 0
+    )
+    event = {
+        "generation": sim["generation"],
+        "playing": sim["playing"],
+        "rules": config.rule_name(sim["params"]),
+        "seed": sim["seed"],
+        "soup": sim["soup"],
+        "rate": round(sim["rate"], 1),
+        "statistics": {
+            "Live Cells": int(live),
+            "Population Density": f"{density:.2%}",
+            "Average Age": f"{average_age:.2f} Gens"
+        },
+        "width": small.shape[1],
+        "height": small.shape[0],
+        # 1 or 2 bytes per cell (little endian), an index into the palette
+        "depth": small.dtype.itemsize,
+        "frame": base64.b64encode(zlib.compress(small.astype(small.dtype.newbyteorder("<"), copy=False).tobytes(), 1)).decode()
+    }
+    data = f"event: frame\ndata: {json.dumps(event)}\n\n".encode()
+    sim["frames"][factor] = data
+    return data
+
+async def stream(sim, writer, fps, size):
+    # One client: newest frame at most fps times a second, waiting only on its own socket
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+    sent_version = None
+    sent_palette = None
+    while True:
+        tick = time.perf_counter()
+        if sent_palette != sim["palette_version"]:
+            sent_palette = sim["palette_version"]
+            writer.write(f"event: palette\ndata: {json.dumps(sim['palette'])}\n\n".encode())
+        if sent_version != sim["version"]:
+            sent_version = sim["version"]
+            writer.write(frame_event(sim, size))
+        await writer.drain()
+        await asyncio.sleep(max(0, 1 / fps - (time.perf_counter() - tick)))
+
+def status(sim):
+    return {
+        "Metadata": config.run_metadata(sim["params"], sim["seed"], sim["soup"]),
+        "Generation": sim["generation"],
+        "Playing": sim["playing"],
+        "Speed": sim["speed"],
+        "Rate": sim["rate"]
+    }
+
+def apply_command(sim, command):
+    # Raises ValueError for anything malformed, the client gets it back as a 400
+    name = command.get("command")
+    # Pausing, playing and a new soup all drop whatever single steps are still queued
+    if name == "pause":
+        sim["playing"] = False
+        sim["steps"] = 0
+    elif name == "play":
+        sim["playing"] = True
+        sim["steps"] = 0
+    elif name == "step":
+        count = int(command.get("count", 1))
+        if not 1 <= count <= MAX_STEPS:
+            raise ValueError(f"Step count must be between 1 and {MAX_STEPS}, got {count}")
+        sim["playing"] = False
+        sim["steps"] = min(sim["steps"] + count, MAX_STEPS)
+    elif name == "seed":
+        # No seed steps to the next soup of the current one
+        if command.get("seed") is None:
+            new_soup(sim, sim["seed"], int(command.get("soup", sim["soup"] + 1)))
+        else:
+            new_soup(sim, int(command["seed"]), int(command.get("soup", 0)))
+    elif name == "rule":
+        if "preset" in command:
+            survival, reproduction = config.RULE_PRESETS[int(command["preset"]) % len(config.RULE_PRESETS)]
+            changes = {"SURVIVAL_CELL_AMOUNT": survival, "REPRODUCTION_CELL_AMOUNT": reproduction}
+        else:
+            changes = dict(command.get("parameters", {}))
+        unknown = set(changes) - set(config.RULE_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Only rule parameters can change while running, not {', '.join(sorted(unknown))}")
+        params = {**sim["params"], **changes}
+        config.validate_parameters(params)
+        set_rules(sim, params)
+    elif name == "speed":
+        sim["speed"] = max(0, int(command.get("generations_per_second", 0)))
+    else:
+        raise ValueError(f"Unknown command {name!r}")
+    sim["wake"].set()
+    return status(sim)
+
+def respond(writer, code, content_type, body):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}[code]
+    body = body.encode() if isinstance(body, str) else body
+    writer.write(f"HTTP/1.1 {code} {reason}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+
+async def handle(sim, reader, writer):
+    try:
+        method, target, _ = (await reader.readline()).decode().split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        path, _, query = target.partition("?")
+        query = {name: values[-1] for name, values in urllib.parse.parse_qs(query).items()}
+        if method == "GET" and path == "/":
+            presets = "".join(
+                f'<option value="{index}">{config.rule_name({"SURVIVAL_CELL_AMOUNT": survival, "REPRODUCTION_CELL_AMOUNT": reproduction})}</option>'
+                for index, (survival, reproduction) in enumerate(config.RULE_PRESETS)
+            )
+            respond(writer, 200, "text/html; charset=utf-8", PAGE.replace("<!-- presets -->", presets))
+        elif method == "GET" and path == "/stream":
+            fps = min(MAX_CLIENT_FPS, max(1, int(query.get("fps", 15))))
+            await stream(sim, writer, fps, max(16, int(query.get("size", 256))))
+        elif method == "GET" and path == "/state":
+            respond(writer, 200, "application/json", json.dumps(status(sim)))
+        elif method == "POST" and path == "/command":
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            try:
+                respond(writer, 200, "application/json", json.dumps(apply_command(sim, json.loads(body))))
+            except (ValueError, TypeError, AttributeError) as error:
+                respond(writer, 400, "application/json", json.dumps({"Error": str(error)}))
+        else:
+            respond(writer, 404, "text/plain", "Not Found")
+        await writer.drain()
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        # Closed viewers and garbled requests only end their own connection
+        pass
+    finally:
+        writer.close()
+
+async def serve(params, seed, soup=0, host="127.0.0.1", port=8765):
+    sim = new_simulation(params, seed, soup)
+    server = await asyncio.start_server(lambda reader, writer: handle(sim, reader, writer), host, port)
+    print(config.metadata_text(config.run_metadata(params, seed, soup)))
+    print(f"Serving on http://{host}:{port}/")
+    async with server:
+        await asyncio.gather(server.serve_forever(), simulate(sim))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream a board of Conway's Conundrum to a browser")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on, localhost only by default")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--soup", type=int, help="0 unless replayed")
+    config.add_parameter_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    try:
+        replay = config.replay_from_args(args)
+        params = config.layered_parameters(args.config, config.overrides_from_args(args), replay=replay)
+        engine.check_engine(params["ENGINE"], engine.make_rules(params))
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"error: {error}")
+
+    seed = params["SEED"] if params["SEED"] is not None else config.new_seed()
+    try:
+        asyncio.run(serve(params, seed, config.replay_soup(args, replay), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+# Viewer page: draws frames with the palette it was sent and posts commands back
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<title>Conway's Conundrum</title>
+<style>
+body { background: #111; color: #ddd; font-family: monospace; margin: 20px; }
+canvas { image-rendering: pixelated; width: min(90vh, 90vw); border: 1px solid #444; }
+button, select, input { font-family: monospace; margin: 2px; }
+</style>
+</head>
+<body>
+<div>
+<button onclick="send({command: 'play'})">Play</button>
+<button onclick="send({command: 'pause'})">Pause</button>
+<button onclick="send({command: 'step'})">Step</button>
+<button onclick="send({command: 'seed'})">Next Soup</button>
+<input id="seed" size="12" placeholder="seed">
+<button onclick="send({command: 'seed', seed: Number(document.getElementById('seed').value)})">Seed</button>
+<select id="preset" onchange="send({command: 'rule', preset: Number(this.value)})">
+<!-- presets -->
+</select>
+<input id="speed" size="6" placeholder="gens/s">
+<button onclick="send({command: 'speed', generations_per_second: Number(document.getElementById('speed').value)})">Speed</button>
+</div>
+<pre id="statistics"></pre>
+<canvas id="board"></canvas>
+<script>
+const canvas = document.getElementById("board");
+const context = canvas.getContext("2d");
+const params = new URLSearchParams(location.search);
+const source = new EventSource(`/stream?fps=${params.get("fps") || 15}&size=${params.get("size") || 256}`);
+let palette = [[0, 0, 0]];
+let drawing = false;
+
+function send(command) {
+    fetch("/command", {method: "POST", body: JSON.stringify(command)})
+        .then(response => response.json())
+        .then(reply => { if (reply.Error) alert(reply.Error); });
+}
+
+source.addEventListener("palette", event => { palette = JSON.parse(event.data); });
+
+source.addEventListener("frame", async event => {
+    // Frames that arrive while one is still decoding are skipped
+    if (drawing) return;
+    drawing = true;
+    const frame = JSON.parse(event.data);
+    const packed = Uint8Array.from(atob(frame.frame), c => c.charCodeAt(0));
+    const stream = new Blob([packed]).stream().pipeThrough(new DecompressionStream("deflate"));
+    const bytes = await new Response(stream).arrayBuffer();
+    const ages = frame.depth === 2 ? new Uint16Array(bytes) : new Uint8Array(bytes);
+
+    canvas.width = frame.width;
+    canvas.height = frame.height;
+    const image = context.createImageData(frame.width, frame.height);
+    for (let i = 0; i < ages.length; i++) {
+        const color = palette[Math.min(ages[i], palette.length - 1)];
+        image.data[i * 4] = color[0];
+        image.data[i * 4 + 1] = color[1];
+        image.data[i * 4 + 2] = color[2];
+        image.data[i * 4 + 3] = 255;
+    }
+    context.putImageData(image, 0, 0);
+
+    const lines = [
+        `Rules: ${frame.rules}   Seed: ${frame.seed} / Soup ${frame.soup}`,
+        `Generation: ${frame.generation}   ${frame.playing ? frame.rate + " gens/s" : "Paused"}`,
+        ...Object.entries(frame.statistics).map(([name, value]) => `${name}: ${value}`)
+    ];
+    document.getElementById("statistics").textContent = lines.join("\\n");
+    drawing = false;
+});
+</script>
+</body>
+</html>
+"""
+
+if __name__ == "__main__":
+    main()